@@ -0,0 +1,51 @@
+"""
+Gunicorn configuration for serving rr in production.
+
+Run from this directory with: gunicorn -c gunicorn.conf.py
+
+Every value can be tuned through the environment:
+    PORT                    Port to bind (default 8000)
+    WEB_CONCURRENCY         Worker processes (default 2 x CPU cores + 1)
+    GUNICORN_THREADS        Threads per worker for the WSGI server (default 4)
+    GUNICORN_ASGI           Set to 1 to serve rr.asgi with uvicorn workers
+    GUNICORN_PRELOAD        Set to 0 to disable app preloading, e.g. with --reload
+    GUNICORN_MAX_REQUESTS   Requests before a worker is recycled (default 1000)
+    GUNICORN_TIMEOUT        Seconds before a silent worker is killed (default 30)
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+if os.environ.get('GUNICORN_ASGI') == '1':
+    # Event-loop workers; async views keep many requests in flight per worker
+    wsgi_app = 'rr.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'rr.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import Django and the app once in the master so workers fork warm
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Recycle workers gradually so memory growth never needs a full restart
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_worker_init(worker):
+    # Build the follow graph in the background as the worker boots, so no
+    # request loads the edge table (recycled workers start with none)
+    from rr.graph import follow_graph
+
+    follow_graph.rebuild_in_background()
@@ -48,3 +48,10 @@ class NetworkAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['follower__username', 'following__username']
     readonly_fields = ['created_at']
+
+@admin.register(ScoreRollup)
+class ScoreRollupAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'period', 'period_start', 'score', 'checklists', 'refreshed_at']
+    list_filter = ['period']
+    search_fields = ['user__username']
+    raw_id_fields = ['user']
@@ -0,0 +1,163 @@
+"""
+Async (ASGI) versions of the network endpoints.
+
+These are plain Django views rather than DRF ones, so under an ASGI server
+they run on the event loop. The validation, follow and list views share their
+payload builders with the sync views in rr.views, run off the loop with
+sync_to_async, so both stacks respond alike.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .authentication import AsyncJWTAuthentication
+from .caching import get_network_list, network_list_key, set_network_list
+from .conditional import network_list_etag
+from .graph import follow_graph
+from .pubsub import get_broker, score_topic
+from .views import network_follow_payload, network_list_payload, network_validation_payload
+
+logger = logging.getLogger(__name__)
+
+
+class JsonResponse(HttpResponse):
+    """JSON response rendered by the default renderer of the DRF views, so both encode values alike"""
+
+    def __init__(self, data, **kwargs):
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        kwargs.setdefault('content_type', renderer.media_type)
+        super().__init__(renderer.render(data), **kwargs)
+
+
+class AsyncAPIView(View):
+    """Async base view with JWT authentication; every handler must be async"""
+    authentication = AsyncJWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token authenticated like the DRF views, so no CSRF check
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            auth = await self.authentication.aauthenticate(request)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+            response = JsonResponse(detail, status=exc.status_code)
+        else:
+            if auth is not None:
+                request.user, request.auth = auth
+                return await super().dispatch(request, *args, **kwargs)
+            response = JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        if response.status_code == 401:
+            # As DRF does, tell the client which scheme to authenticate with
+            response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+        return response
+
+
+class AsyncNetworkValidationView(AsyncAPIView):
+    """Validate username for network addition"""
+
+    async def get(self, request, username):
+        """Check if username is valid for following"""
+        try:
+            body, status = await sync_to_async(network_validation_payload)(request.user, username)
+        except Exception as e:
+            logger.error(f"Error validating username {username}: {e}")
+            body, status = {"error": "Network operation failed"}, 500
+        return JsonResponse(body, status=status)
+
+
+class AsyncNetworkFollowView(AsyncAPIView):
+    """Add user to network (Follow)"""
+
+    async def post(self, request, username):
+        """Follow a user"""
+        try:
+            body, status = await sync_to_async(network_follow_payload)(request.user, username)
+        except Exception as e:
+            logger.error(f"Error following user {username}: {e}")
+            body, status = {"error": "Network operation failed"}, 500
+        return JsonResponse(body, status=status)
+
+
+class AsyncNetworkListView(AsyncAPIView):
+    """Get network users (Following/Followers list)"""
+
+    async def get(self, request, list_type="following"):
+        """Get following or followers list"""
+        if list_type not in ["following", "followers"]:
+            return JsonResponse({"error": "Invalid list type. Use 'following' or 'followers'"}, status=400)
+
+        etag = await sync_to_async(network_list_etag)(request, list_type)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        page_url = request.build_absolute_uri()
+        cache_key = await sync_to_async(network_list_key)(request.user.id, list_type, page_url)
+        cached_payload = await sync_to_async(get_network_list)(cache_key)
+        if cached_payload is not None:
+            response = JsonResponse(cached_payload, status=200)
+            if etag:
+                response['ETag'] = etag
+            response['X-Cache'] = 'HIT'
+            return response
+
+        try:
+            # The cursor paginator is sync-only; run the page query off the event loop
+            payload = await sync_to_async(network_list_payload)(Request(request), request.user, list_type)
+        except NotFound as exc:
+            return JsonResponse({"detail": exc.detail}, status=404)
+        except Exception as e:
+            logger.error(f"Error getting {list_type} list: {e}")
+            return JsonResponse({"error": "Network operation failed"}, status=500)
+
+        await sync_to_async(set_network_list)(cache_key, payload)
+        response = JsonResponse(payload, status=200)
+        if etag:
+            response['ETag'] = etag
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class AsyncNetworkEventsView(AsyncAPIView):
+    """Stream score changes of followed users as server-sent events"""
+
+    async def get(self, request):
+        """Hold the connection open and push an event whenever a followed user's latest score changes"""
+        if not isinstance(request, ASGIRequest):
+            # WSGI would buffer the whole stream and hold a worker thread for its lifetime
+            return JsonResponse({"detail": "Event streams require an ASGI server."}, status=501)
+        following = await sync_to_async(follow_graph.following)(request.user.id)
+        topics = [score_topic(user_id) for user_id in sorted(following)]
+        response = StreamingHttpResponse(self.events(topics), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def events(self, topics):
+        keepalive = getattr(settings, 'EVENT_STREAM_KEEPALIVE', 15)
+        loop = asyncio.get_running_loop()
+        # Streams end after a while so reconnecting clients pick up new follows
+        deadline = loop.time() + getattr(settings, 'EVENT_STREAM_MAX_DURATION', 300)
+        async with get_broker().subscribe(topics) as subscription:
+            yield f"retry: {keepalive * 1000}\n: following {len(topics)} users\n\n"
+            while (remaining := deadline - loop.time()) > 0:
+                message = await subscription.get(min(keepalive, remaining))
+                if message is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: score\ndata: {json.dumps(message)}\n\n"
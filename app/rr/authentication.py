@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Entries are tuples of CACHED_USER_FIELDS values
+USER_CACHE_PREFIX = 'rr:authuser:fields'
+
+# User fields authentication and permission checks depend on. Saving any of
+# them drops the cached user.
+AUTH_USER_FIELDS = {'username', 'password', 'is_active', 'is_staff', 'is_superuser', 'allow_networking'}
+
+
+# User fields kept in the cache; the password hash is never cached. Other fields
+# are deferred on the cached user and loaded on first access.
+CACHED_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser', 'allow_networking')
+
+
+def _user_cache_key(user_id):
+    return f"{USER_CACHE_PREFIX}:{user_id}"
+
+
+def _cached_user(user_model, values):
+    cached = dict(zip(CACHED_USER_FIELDS, values))
+    # from_db takes the loaded fields in model order
+    field_names = [field.attname for field in user_model._meta.concrete_fields if field.attname in cached]
+    return user_model.from_db(user_model.objects.db, field_names, [cached[name] for name in field_names])
+
+
+def _cache_values(user):
+    return tuple(getattr(user, field) for field in CACHED_USER_FIELDS)
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(_user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that keeps the authenticated user in the cache.
+
+    The CACHED_USER_FIELDS of the user row are loaded at most once per
+    AUTH_USER_CACHE_TIMEOUT seconds instead of on every request. Saves touching
+    AUTH_USER_FIELDS invalidate the entry. Views must save request.user with
+    update_fields.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        key = _user_cache_key(user_id)
+        values = cache.get(key)
+        if values is None:
+            try:
+                user = self.user_model.objects.only(*CACHED_USER_FIELDS).get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            cache.set(key, _cache_values(user), settings.AUTH_USER_CACHE_TIMEOUT)
+        else:
+            user = _cached_user(self.user_model, values)
+        return self.check_user(user, validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """JWT authentication for plain async Django views.
+
+    Token parsing and user caching are identical to CachedJWTAuthentication;
+    the cache and the user row are read with async APIs so the event loop is
+    not blocked.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        key = _user_cache_key(user_id)
+        values = await cache.aget(key)
+        if values is None:
+            try:
+                user = await self.user_model.objects.only(*CACHED_USER_FIELDS).aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            await cache.aset(key, _cache_values(user), settings.AUTH_USER_CACHE_TIMEOUT)
+        else:
+            user = _cached_user(self.user_model, values)
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # The deferred password hash must not be loaded on the event loop
+            await user.arefresh_from_db(fields=['password'])
+        return self.check_user(user, validated_token)
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Documents CachedJWTAuthentication as the same bearer scheme in the API schema"""
+    target_class = 'rr.authentication.CachedJWTAuthentication'
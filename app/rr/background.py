@@ -0,0 +1,57 @@
+"""
+Follow-up work that runs after commit, off the request thread.
+
+Writes that fan out to every follower of a user (network list invalidation,
+leaderboard edge scores) cost O(followers) queries and cache writes. Receivers
+queue them with run_after_commit. Once the transaction commits, they run on
+one background thread per process, so the request that caused them returns
+first. A task is skipped if the same function and arguments are already
+waiting, so a burst of writes by one user fans out once.
+
+Followers see the change once the task has run, usually a few milliseconds
+after the commit.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rr-background')
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def run_after_commit(func, *args):
+    """Run func(*args) in the background once the current transaction commits; args must be hashable"""
+    transaction.on_commit(lambda: _submit(func, args))
+
+
+def _submit(func, args):
+    task = (func, args)
+    with _pending_lock:
+        if task in _pending:
+            return
+        _pending.add(task)
+    _executor.submit(_run, task)
+
+
+def _run(task):
+    func, args = task
+    with _pending_lock:
+        # Changes committed from here on queue the task again
+        _pending.discard(task)
+    try:
+        func(*args)
+    except Exception:
+        logger.exception(f"Background task {func.__qualname__} failed")
+    finally:
+        # The thread's connection goes back to the pool between tasks
+        connection.close()
+
+
+def wait_for_background_tasks():
+    """Block until every task queued so far has run, e.g. before measuring or asserting"""
+    _executor.submit(lambda: None).result()
@@ -0,0 +1,190 @@
+"""
+Helpers for the benchmark management command: synthetic dataset seeding and
+latency/query measurement.
+
+Synthetic users share a username prefix so a run can be cleaned up without
+touching real data.
+"""
+import asyncio
+import itertools
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .middleware import QueryMetrics
+from .models import Checklist, Network, Regret, ScoreRollup, User
+
+BATCH_SIZE = 5000
+
+
+@dataclass
+class Dataset:
+    """Ids of the seeded rows, in the order they were created"""
+    prefix: str
+    user_ids: list = field(default_factory=list)
+    usernames: list = field(default_factory=list)
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def seed_dataset(prefix, users, days, regrets_per_checklist, follows_per_user, skew=1.1, seed=0, log=None):
+    """Bulk insert a synthetic dataset.
+
+    Follow targets are drawn with Zipf-like weights (rank ** -skew), so a few
+    users gather most followers the way popular accounts do. The first seeded
+    user is the most followed one.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    dataset = Dataset(prefix=prefix)
+    now = timezone.now()
+
+    with transaction.atomic():
+        new_users = [User(username=f"{prefix}{i}") for i in range(users)]
+        for batch in _batched(new_users, BATCH_SIZE):
+            User.objects.bulk_create(batch)
+        seeded = list(User.objects.filter(username__startswith=prefix).order_by('id').values_list('id', 'username'))
+        dataset.user_ids = [user_id for user_id, _ in seeded]
+        dataset.usernames = [username for _, username in seeded]
+        log(f"Seeded {len(seeded)} users")
+
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(len(seeded))))
+        edges = []
+        for index, follower_id in enumerate(dataset.user_ids):
+            targets = set(rng.choices(range(len(seeded)), cum_weights=cum_weights, k=follows_per_user))
+            targets.discard(index)
+            edges.extend(Network(follower_id=follower_id, following_id=dataset.user_ids[t]) for t in targets)
+        for batch in _batched(edges, BATCH_SIZE):
+            Network.objects.bulk_create(batch, ignore_conflicts=True)
+        refresh_network_counts(dataset.user_ids)
+        log(f"Seeded {len(edges)} follows")
+
+        today = now.date()
+        checklist_count = 0
+        regret_count = 0
+        for user_batch in _batched(dataset.user_ids, max(1, BATCH_SIZE // max(days, 1))):
+            checklists = []
+            for user_id in user_batch:
+                for day in range(days):
+                    local_date = today - timedelta(days=day)
+                    total = regrets_per_checklist
+                    incomplete = sum(rng.random() < 0.5 for _ in range(total))
+                    checklists.append(Checklist(
+                        user_id=user_id,
+                        local_date=local_date,
+                        created_at=timezone.make_aware(datetime.combine(local_date, dt_time(hour=rng.randrange(24)))),
+                        total_regrets=total,
+                        incomplete_regrets=incomplete,
+                        score=round(incomplete / total, 4) if total else 1,
+                    ))
+            checklists = Checklist.objects.bulk_create(checklists)
+            regrets = [
+                Regret(checklist_id=checklist.id, description=f"regret {n}", success=n >= checklist.incomplete_regrets)
+                for checklist in checklists
+                for n in range(checklist.total_regrets)
+            ]
+            for batch in _batched(regrets, BATCH_SIZE):
+                Regret.objects.bulk_create(batch)
+            ScoreRollup.refresh(user_batch, [today - timedelta(days=day) for day in range(days)])
+            checklist_count += len(checklists)
+            regret_count += len(regrets)
+        Network.refresh_following_scores(Network.objects.filter(follower_id__in=dataset.user_ids))
+        log(f"Seeded {checklist_count} checklists and {regret_count} regrets")
+
+    return dataset
+
+
+def refresh_network_counts(user_ids):
+    """Recompute follower/following counts for the given users in one statement"""
+    followers, following = User.network_count_expressions()
+    User.objects.filter(id__in=user_ids).update(followers_count=followers, following_count=following)
+
+
+def cleanup_dataset(prefix):
+    """Delete every synthetic user (and, by cascade, their rows)"""
+    deleted, _ = User.objects.filter(username__startswith=prefix).delete()
+    return deleted
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(durations_ms, query_counts=None):
+    summary = {
+        'iterations': len(durations_ms),
+        'mean_ms': round(statistics.fmean(durations_ms), 3),
+        'p50_ms': round(percentile(durations_ms, 50), 3),
+        'p95_ms': round(percentile(durations_ms, 95), 3),
+        'p99_ms': round(percentile(durations_ms, 99), 3),
+        'max_ms': round(max(durations_ms), 3),
+    }
+    if query_counts:
+        summary['queries_mean'] = round(statistics.fmean(query_counts), 2)
+        summary['queries_max'] = max(query_counts)
+    return summary
+
+
+def measure(run, iterations, warmup=3, setup=None):
+    """Time run() over a number of iterations, counting SQL queries per call.
+
+    setup(), if given, is called untimed before every iteration and its return
+    value is passed to run().
+    """
+    durations_ms = []
+    query_counts = []
+    for iteration in range(warmup + iterations):
+        argument = setup() if setup else None
+        metrics = QueryMetrics()
+        with connection.execute_wrapper(metrics):
+            started = time.perf_counter()
+            result = run(argument) if setup else run()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        status = getattr(result, 'status_code', None)
+        if status is not None and status >= 400:
+            raise RuntimeError(f"Benchmark request failed with status {status}: {getattr(result, 'data', '')}")
+        if iteration >= warmup:
+            durations_ms.append(elapsed_ms)
+            query_counts.append(metrics.count)
+    return summarize(durations_ms, query_counts)
+
+
+async def measure_concurrent(request, total, concurrency):
+    """Issue total requests with at most concurrency in flight; returns latency and throughput.
+
+    request(i) must be a coroutine function returning a response.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    durations_ms = []
+
+    async def one(index):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await request(index)
+            durations_ms.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f"Benchmark request failed with status {response.status_code}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(total)))
+    wall_seconds = time.perf_counter() - started
+    return {
+        'concurrency': concurrency,
+        'throughput_rps': round(total / wall_seconds, 2),
+        'wall_s': round(wall_seconds, 3),
+        **summarize(durations_ms),
+    }
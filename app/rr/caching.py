@@ -0,0 +1,117 @@
+"""
+Response caching for the network following/followers lists.
+
+Every (user, list type) pair has a generation token stored in the cache, and
+cached pages are keyed by it. Invalidating a list is then a single cache write
+however many pages or page sizes of it were cached. A global generation lets
+bulk jobs invalidate every list at once.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .background import run_after_commit
+from .models import Network
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'rr:netlist'
+GLOBAL_SCOPE = 'all'
+
+
+def _generation_key(scope):
+    return f"{KEY_PREFIX}:gen:{scope}"
+
+
+def _generation(scope):
+    """Return the current generation token for a scope, creating one if missing"""
+    key = _generation_key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def network_list_generation(user_id, list_type):
+    """Token that changes whenever the (user_id, list_type) list is invalidated"""
+    return f"{_generation(GLOBAL_SCOPE)}:{_generation(f'{list_type}:{user_id}')}"
+
+
+def network_list_key(user_id, list_type, url):
+    """Cache key of one list page, bound to the list's current generation.
+
+    Resolve it once, before building the page, and use it for both the lookup
+    and the store. A change that lands while the page is built moves the list
+    to a new generation, so the outdated page is stored where it is never read.
+    """
+    url_hash = hashlib.md5(url.encode()).hexdigest()
+    return f"{KEY_PREFIX}:{list_type}:{user_id}:{network_list_generation(user_id, list_type)}:{url_hash}"
+
+
+def _count(name):
+    key = f"{KEY_PREFIX}:stats:{name}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Counter missing or evicted; add() keeps a concurrent first increment
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_network_list(key):
+    """Return the list response payload cached under a network_list_key(), or None on a miss"""
+    payload = cache.get(key)
+    _count('hits' if payload is not None else 'misses')
+    return payload
+
+
+def set_network_list(key, payload):
+    cache.set(key, payload, settings.NETWORK_LIST_CACHE_TIMEOUT)
+
+
+def invalidate_network_lists(lists):
+    """Invalidate the given (user_id, list_type) lists once the current transaction commits.
+
+    An earlier generation change would let a concurrent reader cache rows that
+    are about to change under the new generation.
+    """
+    keys = [_generation_key(f"{list_type}:{user_id}") for user_id, list_type in lists]
+    transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time_ns()), timeout=None))
+
+
+def invalidate_lists_containing(user_ids):
+    """Invalidate every list in which any of the given users appears.
+
+    Finding those lists scans the users' edges, so it runs in the background
+    after the current transaction commits (see rr.background).
+    """
+    run_after_commit(_invalidate_lists_containing, tuple(sorted(set(user_ids))))
+
+
+def _invalidate_lists_containing(user_ids):
+    lists = set()
+    for follower_id in Network.objects.filter(following_id__in=user_ids).values_list('follower_id', flat=True):
+        lists.add((follower_id, 'following'))
+    for following_id in Network.objects.filter(follower_id__in=user_ids).values_list('following_id', flat=True):
+        lists.add((following_id, 'followers'))
+    if lists:
+        invalidate_network_lists(lists)
+    logger.debug(f"Invalidated {len(lists)} network lists containing users {list(user_ids)}")
+
+
+def invalidate_all_network_lists():
+    """Invalidate every cached network list, e.g. after bulk checklist generation"""
+    transaction.on_commit(lambda: cache.set(_generation_key(GLOBAL_SCOPE), time.time_ns(), timeout=None))
+
+
+def network_list_cache_stats():
+    """Hit/miss counters for the network list cache"""
+    return {
+        'hits': cache.get(f"{KEY_PREFIX}:stats:hits", 0),
+        'misses': cache.get(f"{KEY_PREFIX}:stats:misses", 0),
+    }
@@ -0,0 +1,44 @@
+"""
+ETags for conditional GETs of the checklist, regret and network list endpoints.
+
+Each ETag is derived from a version stamp that every write advances: a counter
+on the user for their checklists, a counter on the checklist for its regrets,
+and the cache generation of a network list. Network list ETags are only
+issued with NETWORK_LIST_ETAGS, i.e. when the cache is shared by all workers. A request whose If-None-Match
+still matches is answered with 304 Not Modified after one indexed lookup (or
+none, for network lists), without running the list query or serializing.
+
+The absolute URL and the Accept header are part of every tag, since the page,
+its cursor links and the renderer depend on them.
+"""
+import hashlib
+
+from django.conf import settings
+
+from .caching import network_list_generation
+from .models import Checklist, User
+
+
+def _etag(request, *parts):
+    key = ':'.join(str(part) for part in (*parts, request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', '')))
+    return f'W/"{hashlib.md5(key.encode()).hexdigest()}"'
+
+
+def checklists_etag(request, *args, **kwargs):
+    version = User.objects.filter(pk=request.user.pk).values_list('checklists_version', flat=True).first()
+    if version is None:
+        return None
+    return _etag(request, 'checklists', request.user.pk, version)
+
+
+def regrets_etag(request, pk, *args, **kwargs):
+    version = Checklist.objects.filter(pk=pk, user_id=request.user.pk).values_list('version', flat=True).first()
+    if version is None:
+        return None
+    return _etag(request, 'regrets', pk, version)
+
+
+def network_list_etag(request, list_type="following", *args, **kwargs):
+    if not getattr(settings, 'NETWORK_LIST_ETAGS', False) or list_type not in ("following", "followers"):
+        return None
+    return _etag(request, 'network', list_type, request.user.pk, network_list_generation(request.user.pk, list_type))
@@ -0,0 +1,247 @@
+"""
+In-memory snapshot of the follow graph for suggestions and mutual-follow checks.
+
+The snapshot stores the graph in CSR form: a sorted array of follower ids,
+and for follower i the slice targets[offsets[i]:offsets[i + 1]] holds the
+sorted ids of the users they follow. A lookup is two binary searches, with no
+query and no per-edge Python objects.
+
+Follow changes made by this process are recorded in an overlay that is
+consulted before the snapshot. Changes made by other workers bump a version
+counter in the shared cache, which a worker reads at most once per
+FOLLOW_GRAPH_MAX_STALENESS seconds; when it has moved, the snapshot is
+rebuilt. Until then, other workers' changes may be missing. A large overlay
+also triggers a rebuild.
+
+Snapshots are built in a background thread, started when a gunicorn worker
+boots (see gunicorn.conf.py) or on first use. Requests keep reading the
+current snapshot meanwhile, and before the first one exists they are answered
+from the database.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+
+from .models import Network
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'rr:graph:version'
+
+
+def _current_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+def bump_version():
+    """Tell every worker that the follow graph changed"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        if not cache.add(VERSION_KEY, 1, timeout=None):
+            cache.incr(VERSION_KEY)
+
+
+class GraphSnapshot:
+    """Immutable CSR adjacency of follower -> following edges"""
+
+    def __init__(self, followers, offsets, targets, version):
+        self.followers = followers
+        self.offsets = offsets
+        self.targets = targets
+        self.version = version
+        self.built_at = time.monotonic()
+        # When the shared version was last seen to match
+        self.checked_at = self.built_at
+
+    @classmethod
+    def build(cls, version):
+        followers = array('q')
+        offsets = array('q', [0])
+        targets = array('q')
+        edges = (
+            Network.objects.order_by('follower_id', 'following_id')
+            .values_list('follower_id', 'following_id')
+            .iterator(chunk_size=20000)
+        )
+        for follower_id, following_id in edges:
+            if not followers or followers[-1] != follower_id:
+                if followers:
+                    offsets.append(len(targets))
+                followers.append(follower_id)
+            targets.append(following_id)
+        if followers:
+            offsets.append(len(targets))
+        return cls(followers, offsets, targets, version)
+
+    def _slice(self, follower_id):
+        index = bisect_left(self.followers, follower_id)
+        if index == len(self.followers) or self.followers[index] != follower_id:
+            return 0, 0
+        return self.offsets[index], self.offsets[index + 1]
+
+    def following(self, follower_id):
+        start, end = self._slice(follower_id)
+        return self.targets[start:end]
+
+    def follows(self, follower_id, following_id):
+        start, end = self._slice(follower_id)
+        index = bisect_left(self.targets, following_id, start, end)
+        return index < end and self.targets[index] == following_id
+
+    def __len__(self):
+        return len(self.targets)
+
+
+class FollowGraph:
+    """Snapshot plus this process's follow changes since it was built"""
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        # follower_id -> {following_id: (sequence, follows)}
+        self._overlay = {}
+        self._overlay_size = 0
+        self._sequence = 0
+        self._rebuilding = False
+
+    def record(self, follower_id, following_id, follows):
+        """Record an edge added (follows=True) or removed in this process"""
+        with self._lock:
+            self._sequence += 1
+            changes = self._overlay.setdefault(follower_id, {})
+            if following_id not in changes:
+                self._overlay_size += 1
+            changes[following_id] = (self._sequence, follows)
+
+    def snapshot(self):
+        """The current snapshot, or None until the first one is built"""
+        snapshot = self._snapshot
+        if snapshot is None or self._needs_rebuild(snapshot):
+            self.rebuild_in_background()
+        return snapshot
+
+    def rebuild_in_background(self):
+        """Start a rebuild in a background thread unless one is running"""
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name='follow-graph-rebuild', daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Follow graph rebuild failed")
+        finally:
+            self._rebuilding = False
+            # The thread opened its own connection
+            connection.close()
+
+    def _needs_rebuild(self, snapshot):
+        if self._overlay_size > getattr(settings, 'FOLLOW_GRAPH_MAX_OVERLAY', 10000):
+            return True
+        now = time.monotonic()
+        if now - snapshot.checked_at < getattr(settings, 'FOLLOW_GRAPH_MAX_STALENESS', 60):
+            return False
+        if _current_version() != snapshot.version:
+            return True
+        snapshot.checked_at = now
+        return False
+
+    def rebuild(self):
+        with self._rebuild_lock:
+            # Another thread may have rebuilt while this one waited
+            if self._snapshot is not None and not self._needs_rebuild(self._snapshot):
+                return self._snapshot
+            started = time.perf_counter()
+            with self._lock:
+                sequence = self._sequence
+            snapshot = GraphSnapshot.build(_current_version())
+            with self._lock:
+                # Changes recorded after the build started may be missing from it
+                for follower_id in list(self._overlay):
+                    changes = {
+                        following_id: change
+                        for following_id, change in self._overlay[follower_id].items()
+                        if change[0] > sequence
+                    }
+                    if changes:
+                        self._overlay[follower_id] = changes
+                    else:
+                        del self._overlay[follower_id]
+                self._overlay_size = sum(len(changes) for changes in self._overlay.values())
+                self._snapshot = snapshot
+            logger.debug(f"Rebuilt follow graph with {len(snapshot)} edges in {(time.perf_counter() - started) * 1000:.1f}ms")
+            return snapshot
+
+    def follows(self, follower_id, following_id):
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return Network.objects.filter(follower_id=follower_id, following_id=following_id).exists()
+        change = self._overlay.get(follower_id, {}).get(following_id)
+        if change is not None:
+            return change[1]
+        return snapshot.follows(follower_id, following_id)
+
+    def following(self, follower_id):
+        """Set of user ids that follower_id follows"""
+        return self._following(self.snapshot(), follower_id)
+
+    def _following(self, snapshot, follower_id):
+        if snapshot is None:
+            return set(Network.objects.filter(follower_id=follower_id).values_list('following_id', flat=True))
+        following = set(snapshot.following(follower_id))
+        for following_id, (_, follows) in list(self._overlay.get(follower_id, {}).items()):
+            if follows:
+                following.add(following_id)
+            else:
+                following.discard(following_id)
+        return following
+
+    def suggestions(self, user_id, limit):
+        """Users followed by the people user_id follows, as (user_id, mutual follows) pairs, best first"""
+        snapshot = self.snapshot()
+        following = self._following(snapshot, user_id)
+        if snapshot is None:
+            return list(
+                Network.objects.filter(follower_id__in=following)
+                .exclude(following_id__in=following | {user_id})
+                .values('following_id')
+                .annotate(mutual=Count('id'))
+                .order_by('-mutual', 'following_id')
+                .values_list('following_id', 'mutual')[:limit]
+            )
+        candidates = Counter()
+        for followed_id in following:
+            candidates.update(self._following(snapshot, followed_id))
+        candidates.pop(user_id, None)
+        for followed_id in following:
+            candidates.pop(followed_id, None)
+        return candidates.most_common(limit)
+
+    def stats(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'built': False, 'overlay_edges': self._overlay_size}
+        return {
+            'built': True,
+            'edges': len(snapshot),
+            'followers': len(snapshot.followers),
+            'version': snapshot.version,
+            'age_s': round(time.monotonic() - snapshot.built_at, 1),
+            'overlay_edges': self._overlay_size,
+        }
+
+
+follow_graph = FollowGraph()
@@ -0,0 +1,352 @@
+import asyncio
+import json
+import platform
+import time
+from datetime import timedelta
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from rr.background import wait_for_background_tasks
+from rr.benchmark import cleanup_dataset, measure, measure_concurrent, seed_dataset, summarize
+from rr.metrics import database_pool_stats
+from rr.search import prefix_cache
+from rr.models import Checklist, Network, Regret, User
+from rr.renderers import MessagePackRenderer, ORJSONRenderer
+from rr.serializers import CHECKLIST_ROW_FIELDS, REGRET_ROW_FIELDS, ChecklistSerializer, RegretSerializer
+
+
+class Command(BaseCommand):
+    help = 'Seeds a synthetic dataset and measures latency and query counts for every API endpoint'
+
+    scenarios = ('endpoints', 'async_network', 'signup_burst', 'event_stream', 'serialization')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            choices=self.scenarios,
+            default='endpoints',
+            help='endpoints: every API endpoint sequentially; '
+                 'async_network: sync vs async network views at increasing concurrency over ASGI; '
+                 'signup_burst: concurrent login-or-register calls for new and colliding usernames; '
+                 'event_stream: delivery latency of score changes to open network event streams; '
+                 'serialization: building and rendering list payloads, per 1,000 objects',
+        )
+        parser.add_argument(
+            '--concurrency',
+            default='1,10,50',
+            help='Comma-separated in-flight request counts for concurrent scenarios (default: 1,10,50)',
+        )
+        parser.add_argument('--users', type=int, default=1000, help='Number of synthetic users (default: 1000)')
+        parser.add_argument('--days', type=int, default=30, help='Days of checklist history per user (default: 30)')
+        parser.add_argument('--regrets', type=int, default=5, help='Regrets per checklist (default: 5)')
+        parser.add_argument('--follows', type=int, default=50, help='Follows drawn per user (default: 50)')
+        parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of follow fan-in (default: 1.1)')
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per endpoint (default: 50)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the dataset (default: 0)')
+        parser.add_argument('--prefix', default='bench_', help='Username prefix of synthetic users (default: bench_)')
+        parser.add_argument('--output', default='benchmark_results.json', help='File the JSON results are written to')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic dataset after the run')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if not prefix:
+            raise CommandError('--prefix must not be empty')
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Users with prefix "{prefix}" already exist; remove them or choose another --prefix')
+
+        started = time.monotonic()
+        dataset = seed_dataset(
+            prefix,
+            users=options['users'],
+            days=options['days'],
+            regrets_per_checklist=options['regrets'],
+            follows_per_user=options['follows'],
+            skew=options['skew'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(f'Dataset ready in {time.monotonic() - started:.2f}s')
+
+        try:
+            if options['scenario'] == 'async_network':
+                concurrency_levels = [int(level) for level in options['concurrency'].split(',')]
+                results = asyncio.run(self.run_async_network(dataset, options['iterations'], concurrency_levels))
+            elif options['scenario'] == 'signup_burst':
+                concurrency_levels = [int(level) for level in options['concurrency'].split(',')]
+                results = asyncio.run(self.run_signup_burst(dataset, options['iterations'], concurrency_levels))
+            elif options['scenario'] == 'event_stream':
+                concurrency_levels = [int(level) for level in options['concurrency'].split(',')]
+                results = asyncio.run(self.run_event_stream(dataset, options['iterations'], concurrency_levels))
+            elif options['scenario'] == 'serialization':
+                results = self.run_serialization(dataset, options['iterations'])
+            else:
+                results = self.run_endpoints(dataset, options['iterations'])
+        finally:
+            # Fan-out queued by the measured writes must not race the cleanup
+            wait_for_background_tasks()
+            if not options['keep']:
+                cleanup_dataset(prefix)
+                self.stdout.write('Removed synthetic dataset')
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': settings.DATABASES['default']['ENGINE'],
+                'debug': settings.DEBUG,
+            },
+            'scenario': options['scenario'],
+            'dataset': {key: options[key] for key in ('users', 'days', 'regrets', 'follows', 'skew', 'seed')},
+            'iterations': options['iterations'],
+            'results': results,
+            'database_pool': database_pool_stats(),
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}"))
+
+    def run_endpoints(self, dataset, iterations):
+        # The first seeded user is the most followed; the last one has no special standing
+        subject = User.objects.get(id=dataset.user_ids[0])
+        stranger = User.objects.get(id=dataset.user_ids[-1])
+        Network.objects.filter(follower=subject, following=stranger).delete()
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(subject).access_token}')
+        checklist = Checklist.objects.filter(user=subject).order_by('-created_at').first()
+        local_datetime = timezone.localtime(checklist.created_at).isoformat()
+        week_ago = checklist.local_date - timedelta(days=7)
+
+        def fresh_refresh_token():
+            return str(RefreshToken.for_user(subject))
+
+        def fresh_regret():
+            return Regret.objects.create(checklist=checklist, description='benchmark regret')
+
+        def unfollowed():
+            Network.objects.filter(follower=subject, following=stranger).delete()
+
+        batch_usernames = dataset.usernames[-21:-1]
+
+        def unfollowed_batch():
+            Network.objects.filter(follower=subject, following__username__in=batch_usernames).delete()
+
+        def followed():
+            if not Network.objects.filter(follower=subject, following=stranger).exists():
+                Network.objects.create(follower=subject, following=stranger)
+
+        def current_etag(url):
+            return lambda: client.get(url)['ETag']
+
+        def not_modified(url):
+            return lambda etag: client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        regrets_url = f'/api/checklists/{checklist.id}/regrets/'
+        cases = {
+            'login_or_register': (lambda: client.post('/auth/user/', {'username': subject.username}, format='json'), None),
+            'token_refresh': (lambda token: client.post('/auth/jwt/refresh/', {'refresh': token}, format='json'), fresh_refresh_token),
+            'checklists_list': (lambda: client.get('/api/checklists/'), None),
+            'checklists_list_not_modified': (not_modified('/api/checklists/'), current_etag('/api/checklists/')),
+            'checklists_list_window': (
+                lambda: client.get(f'/api/checklists/?local_date_after={week_ago}&fields=local_date,score'), None,
+            ),
+            'checklists_history': (lambda: client.get('/api/checklists/history/'), None),
+            'checklists_history_monthly': (lambda: client.get('/api/checklists/history/?period=month'), None),
+            'checklists_get_or_create': (lambda: client.post('/api/checklists/', {'local_datetime': local_datetime}, format='json'), None),
+            'regrets_list': (lambda: client.get(regrets_url), None),
+            'regrets_list_not_modified': (not_modified(regrets_url), current_etag(regrets_url)),
+            'regrets_create': (lambda: client.post(regrets_url, {'description': 'benchmark regret'}, format='json'), None),
+            'regrets_batch_create': (
+                lambda: client.post(f'{regrets_url}batch/', [{'description': f'benchmark regret {n}'} for n in range(5)], format='json'),
+                None,
+            ),
+            'regret_update': (lambda regret: client.patch(f'{regrets_url}{regret.id}/', {'success': True}, format='json'), fresh_regret),
+            'network_validate': (lambda _: client.get(f'/api/network/validate/{stranger.username}/'), unfollowed),
+            'network_search': (lambda: client.get(f'/api/network/search/?q={dataset.prefix}1'), None),
+            'network_search_uncached': (lambda _: client.get(f'/api/network/search/?q={dataset.prefix}2'), prefix_cache.clear),
+            'network_follow': (lambda _: client.post(f'/api/network/follow/{stranger.username}/'), unfollowed),
+            'network_follow_batch': (
+                lambda _: client.post('/api/network/follow-batch/', {'usernames': batch_usernames}, format='json'),
+                unfollowed_batch,
+            ),
+            'network_unfollow': (lambda _: client.delete(f'/api/network/unfollow/{stranger.username}/'), followed),
+            'network_list_following': (lambda: client.get('/api/network/list/following/'), None),
+            'network_list_followers': (lambda: client.get('/api/network/list/followers/'), None),
+            'network_leaderboard': (lambda: client.get('/api/network/leaderboard/'), None),
+            'network_leaderboard_desc': (lambda: client.get('/api/network/leaderboard/?order=desc&page_size=200'), None),
+            'network_suggestions': (lambda: client.get('/api/network/suggestions/'), None),
+            'network_settings_get': (lambda: client.get('/api/network/settings/'), None),
+            'network_settings_patch': (lambda: client.patch('/api/network/settings/', {'allow_networking': True}, format='json'), None),
+        }
+        if getattr(settings, 'NETWORK_LIST_ETAGS', False):
+            cases['network_list_not_modified'] = (
+                not_modified('/api/network/list/following/'), current_etag('/api/network/list/following/'),
+            )
+
+        results = {}
+        for name, (run, setup) in cases.items():
+            results[name] = measure(run, iterations, setup=setup)
+            summary = results[name]
+            self.stdout.write(
+                f"{name:<28} p50 {summary['p50_ms']:>8.2f}ms  p95 {summary['p95_ms']:>8.2f}ms  "
+                f"p99 {summary['p99_ms']:>8.2f}ms  queries {summary['queries_mean']:>6.1f}"
+            )
+        return results
+
+    def run_serialization(self, dataset, iterations, objects=1000):
+        """Time building list payloads from the database and rendering them, per 1,000 objects.
+
+        Compares model serializers with the value rows the list views send, and
+        DRF's JSON renderer with the orjson and MessagePack ones. Build times
+        include fetching the rows.
+        """
+        checklists = Checklist.objects.filter(user_id__in=dataset.user_ids).order_by('id')[:objects]
+        regrets = Regret.objects.filter(checklist__user_id__in=dataset.user_ids).order_by('id')[:objects]
+        if checklists.count() < objects or regrets.count() < objects:
+            raise CommandError(f'The dataset needs at least {objects} checklists and regrets; raise --users or --days')
+
+        builds = {
+            'checklists_serializer': lambda: ChecklistSerializer(checklists, many=True).data,
+            'checklists_rows': lambda: list(checklists.values(*CHECKLIST_ROW_FIELDS)),
+            'regrets_serializer': lambda: RegretSerializer(regrets, many=True).data,
+            'regrets_rows': lambda: list(regrets.values(*REGRET_ROW_FIELDS)),
+        }
+        renderers = {'json': JSONRenderer(), 'orjson': ORJSONRenderer()}
+        if 'rr.renderers.MessagePackRenderer' in settings.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']:
+            renderers['msgpack'] = MessagePackRenderer()
+
+        results = {}
+        for name, build in builds.items():
+            results[f'{name}_build'] = measure(build, iterations)
+            data = build()
+            for renderer_name, renderer in renderers.items():
+                results[f'{name}_render_{renderer_name}'] = measure(lambda: renderer.render(data), iterations)
+                results[f'{name}_render_{renderer_name}']['bytes'] = len(renderer.render(data))
+        for name, summary in results.items():
+            size = f"  {summary['bytes']:>8} bytes" if 'bytes' in summary else ''
+            self.stdout.write(f"{name:<36} p50 {summary['p50_ms']:>8.2f}ms  p99 {summary['p99_ms']:>8.2f}ms{size}")
+        return results
+
+    async def run_async_network(self, dataset, iterations, concurrency_levels):
+        """Compare sync and async network views through the ASGI handler.
+
+        Under ASGI, sync views share one thread per process, so this shows how
+        many requests a single worker keeps in flight with each implementation.
+        """
+        subject = await User.objects.aget(id=dataset.user_ids[0])
+        stranger = await User.objects.aget(id=dataset.user_ids[-1])
+        await Network.objects.filter(follower=subject, following=stranger).adelete()
+        access_token = await sync_to_async(lambda: str(RefreshToken.for_user(subject).access_token))()
+        headers = {'Authorization': f'Bearer {access_token}'}
+        client = AsyncClient()
+
+        # A distinct query string per request defeats the list cache so every
+        # request reaches the database
+        cases = {
+            'network_validate': lambda prefix: lambda i: client.get(
+                f'{prefix}/network/validate/{stranger.username}/', headers=headers),
+            'network_list_following': lambda prefix: lambda i: client.get(
+                f'{prefix}/network/list/following/?page_size=100&nocache={i}', headers=headers),
+            'network_list_followers': lambda prefix: lambda i: client.get(
+                f'{prefix}/network/list/followers/?page_size=100&nocache={i}', headers=headers),
+        }
+
+        results = {}
+        for name, request_for in cases.items():
+            for variant, prefix in (('sync', '/api'), ('async', '/api/async')):
+                key = f'{name}_{variant}'
+                results[key] = []
+                for concurrency in concurrency_levels:
+                    summary = await measure_concurrent(request_for(prefix), iterations, concurrency)
+                    results[key].append(summary)
+                    self.stdout.write(
+                        f"{key:<30} c={concurrency:<4} {summary['throughput_rps']:>9.1f} req/s  "
+                        f"p50 {summary['p50_ms']:>8.2f}ms  p99 {summary['p99_ms']:>8.2f}ms"
+                    )
+        return results
+
+    async def run_signup_burst(self, dataset, iterations, concurrency_levels):
+        """Hit login-or-register with a burst of signups.
+
+        Every new username is sent twice in the same burst, so half the calls
+        race the signup of the same name and must resolve to the same user.
+        Usernames carry the dataset prefix and are removed with it.
+        """
+        client = AsyncClient()
+        results = {}
+        for concurrency in concurrency_levels:
+            def signup(i, concurrency=concurrency):
+                username = f'{dataset.prefix}signup_{concurrency}_{i // 2}'
+                return client.post('/auth/user/', {'username': username}, content_type='application/json')
+
+            summary = await measure_concurrent(signup, iterations, concurrency)
+            created = await User.objects.filter(username__startswith=f'{dataset.prefix}signup_{concurrency}_').acount()
+            summary['users_created'] = created
+            results.setdefault('signup_burst', []).append(summary)
+            self.stdout.write(
+                f"{'signup_burst':<30} c={concurrency:<4} {summary['throughput_rps']:>9.1f} req/s  "
+                f"p50 {summary['p50_ms']:>8.2f}ms  p99 {summary['p99_ms']:>8.2f}ms  created {created}"
+            )
+        return results
+
+    async def run_event_stream(self, dataset, iterations, concurrency_levels):
+        """Measure how fast score changes reach open network event streams.
+
+        For each concurrency level that many followers of the most followed
+        user hold a stream open while the user adds regrets to a checklist.
+        Latency runs from the start of the write to the event reaching each
+        stream, so it includes the write itself.
+        """
+        subject_id = dataset.user_ids[0]
+        checklist = await Checklist.objects.filter(user_id=subject_id).order_by('-created_at').afirst()
+        client = AsyncClient()
+        results = {}
+        for concurrency in concurrency_levels:
+            follower_ids = [
+                user_id async for user_id in Network.objects.filter(following_id=subject_id)
+                .order_by('follower_id').values_list('follower_id', flat=True)[:concurrency]
+            ]
+            tokens = await sync_to_async(lambda: [
+                str(RefreshToken.for_user(user).access_token) for user in User.objects.filter(id__in=follower_ids)
+            ])()
+            received = asyncio.Queue()
+
+            async def listen(token):
+                response = await client.get('/api/async/network/events/', headers={'Authorization': f'Bearer {token}'})
+                async for chunk in response.streaming_content:
+                    if chunk.startswith(b'event: score'):
+                        received.put_nowait(time.perf_counter())
+
+            listeners = [asyncio.create_task(listen(token)) for token in tokens]
+            # Let every stream subscribe before the first write
+            await asyncio.sleep(0.5)
+            durations_ms = []
+            try:
+                for n in range(iterations):
+                    started = time.perf_counter()
+                    await Regret.objects.acreate(checklist=checklist, description=f'benchmark regret {n}')
+                    for _ in tokens:
+                        arrived = await asyncio.wait_for(received.get(), timeout=10)
+                        durations_ms.append((arrived - started) * 1000)
+            finally:
+                for listener in listeners:
+                    listener.cancel()
+                await asyncio.gather(*listeners, return_exceptions=True)
+
+            summary = {'concurrency': len(tokens), 'events': len(durations_ms), **summarize(durations_ms)}
+            results.setdefault('event_stream', []).append(summary)
+            self.stdout.write(
+                f"{'event_stream':<30} c={len(tokens):<4} events {len(durations_ms):>6}  "
+                f"p50 {summary['p50_ms']:>8.2f}ms  p99 {summary['p99_ms']:>8.2f}ms"
+            )
+        return results
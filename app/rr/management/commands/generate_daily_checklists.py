@@ -1,30 +1,79 @@
+import time
+
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db import transaction
-from rr.models import User, Checklist
+from rr.models import User, Checklist, Network, ScoreRollup
+from rr.caching import invalidate_all_network_lists
 
 class Command(BaseCommand):
     help = 'Generates a new checklist for each active user for the current day'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of users handled per statement batch and transaction (default: 5000)',
+        )
+
     def handle(self, *args, **options):
-        today = timezone.now()
-        active_users = User.objects.filter(is_active=True)
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            self.stderr.write(self.style.ERROR('--chunk-size must be at least 1'))
+            return
+
+        now = timezone.now()
+        today = now.date()
+        started = time.monotonic()
         checklists_created = 0
+        users_seen = 0
+        last_id = 0
 
-        with transaction.atomic():
-            for user in active_users:
-                # Check if user already has a checklist for today
-                existing_checklist = Checklist.objects.filter(
-                    user=user,
-                    created_at__date=today.date()
-                ).exists()
+        # Walk active users in primary key order so each chunk is an index range scan
+        while True:
+            user_ids = list(
+                User.objects.filter(is_active=True, id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            users_seen += len(user_ids)
+
+            with transaction.atomic():
+                existing = set(
+                    Checklist.objects.filter(user_id__in=user_ids, local_date=today)
+                    .values_list('user_id', flat=True)
+                )
+                new_checklists = [
+                    Checklist(user_id=user_id, created_at=now, local_date=today)
+                    for user_id in user_ids
+                    if user_id not in existing
+                ]
+                # A checklist created by the app in the meantime is skipped by the unique constraint
+                Checklist.objects.bulk_create(new_checklists, ignore_conflicts=True)
+                # bulk_create skips post_save, so rollups, leaderboard scores and version stamps are refreshed for the whole chunk
+                if new_checklists:
+                    new_user_ids = [checklist.user_id for checklist in new_checklists]
+                    ScoreRollup.refresh(new_user_ids, [today])
+                    User.touch_checklists(new_user_ids)
+                    Network.refresh_following_scores(Network.objects.filter(following_id__in=new_user_ids))
+
+            checklists_created += len(new_checklists)
+            self.stdout.write(
+                f'Processed {users_seen} users, created {checklists_created} checklists '
+                f'({time.monotonic() - started:.2f}s)'
+            )
 
-                if not existing_checklist:
-                    Checklist.objects.create(user=user)
-                    checklists_created += 1
+        if checklists_created:
+            # bulk_create skips signals, and new checklists change every network list
+            invalidate_all_network_lists()
 
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully created {checklists_created} new checklists'
+                f'Successfully created {checklists_created} new checklists '
+                f'for {users_seen} active users in {time.monotonic() - started:.2f}s'
             )
-        ) 
\ No newline at end of file
+        )
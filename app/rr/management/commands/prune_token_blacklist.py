@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from rr.tokens import retention_cutoff
+
+
+class Command(BaseCommand):
+    help = ('Deletes blacklisted refresh tokens older than REFRESH_TOKEN_RETENTION '
+            'and expired outstanding tokens, in chunks')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of tokens deleted per statement batch and transaction (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            self.stderr.write(self.style.ERROR('--chunk-size must be at least 1'))
+            return
+
+        # The cutoff is fixed for the run and always comes from settings, so a
+        # pruned token is older than the window RetainedRefreshToken enforces
+        cutoff = retention_cutoff()
+        prunable = OutstandingToken.objects.filter(
+            Q(blacklistedtoken__isnull=False, created_at__lt=cutoff) | Q(expires_at__lt=timezone.now())
+        )
+        started = time.monotonic()
+        deleted = 0
+        last_id = 0
+
+        while True:
+            token_ids = list(
+                prunable.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not token_ids:
+                break
+            last_id = token_ids[-1]
+
+            with transaction.atomic():
+                # Deleting the outstanding token cascades to its blacklist entry
+                OutstandingToken.objects.filter(id__in=token_ids).delete()
+
+            deleted += len(token_ids)
+            self.stdout.write(f'Deleted {deleted} tokens ({time.monotonic() - started:.2f}s)')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Pruned {deleted} tokens blacklisted before {cutoff:%Y-%m-%d %H:%M} UTC '
+                f'(retention {settings.REFRESH_TOKEN_RETENTION.days} days) in {time.monotonic() - started:.2f}s'
+            )
+        )
@@ -0,0 +1,84 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from rr.models import User
+
+
+class Command(BaseCommand):
+    help = 'Recomputes followers_count and following_count of every user from the Network table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of users checked per statement batch and transaction (default: 5000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted counts without updating them',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            self.stderr.write(self.style.ERROR('--chunk-size must be at least 1'))
+            return
+        dry_run = options['dry_run']
+
+        followers, following = User.network_count_expressions()
+        started = time.monotonic()
+        users_seen = 0
+        drifted_users = 0
+        followers_drift = 0
+        following_drift = 0
+        last_id = 0
+
+        # Walk users in primary key order; each chunk is a short transaction that
+        # only locks the rows whose counts actually drifted
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            users_seen += len(user_ids)
+
+            with transaction.atomic():
+                drifted = list(
+                    User.objects.filter(id__in=user_ids)
+                    .annotate(actual_followers=followers, actual_following=following)
+                    .exclude(followers_count=F('actual_followers'), following_count=F('actual_following'))
+                    .values_list('id', 'username', 'followers_count', 'actual_followers', 'following_count', 'actual_following')
+                )
+                if drifted and not dry_run:
+                    User.objects.filter(id__in=[row[0] for row in drifted]).update(
+                        followers_count=followers,
+                        following_count=following,
+                    )
+
+            for user_id, username, stored_followers, actual_followers, stored_following, actual_following in drifted:
+                followers_drift += abs(stored_followers - actual_followers)
+                following_drift += abs(stored_following - actual_following)
+                if options['verbosity'] >= 2:
+                    self.stdout.write(
+                        f'  {username} ({user_id}): followers {stored_followers} -> {actual_followers}, '
+                        f'following {stored_following} -> {actual_following}'
+                    )
+            drifted_users += len(drifted)
+            self.stdout.write(
+                f'Checked {users_seen} users, {drifted_users} drifted ({time.monotonic() - started:.2f}s)'
+            )
+
+        action = 'Found' if dry_run else 'Fixed'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{action} {drifted_users} of {users_seen} users with drifted counts '
+                f'(followers off by {followers_drift}, following off by {following_drift} in total) '
+                f'in {time.monotonic() - started:.2f}s'
+            )
+        )
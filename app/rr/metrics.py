@@ -0,0 +1,37 @@
+"""
+Runtime metrics of the current worker process, for operators.
+
+Every gunicorn worker has its own connection pool and counters, so numbers
+describe the process that served the request.
+"""
+import os
+
+from django.db import connections
+
+from .caching import network_list_cache_stats
+from .graph import follow_graph
+
+
+def database_pool_stats(alias='default'):
+    """Stats of the connection pool behind a database alias, or None if it is not pooled.
+
+    Counters are cumulative since the pool opened. requests_wait_ms is the total
+    time requests spent waiting for a free connection; a growing
+    requests_waiting means the pool is too small for the load.
+    """
+    pool = getattr(connections[alias], 'pool', None)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    served = stats.get('requests_num', 0)
+    stats['requests_wait_ms_mean'] = round(stats.get('requests_wait_ms', 0) / served, 3) if served else 0.0
+    return stats
+
+
+def runtime_metrics():
+    return {
+        'pid': os.getpid(),
+        'database_pool': database_pool_stats(),
+        'network_list_cache': network_list_cache_stats(),
+        'follow_graph': follow_graph.stats(),
+    }
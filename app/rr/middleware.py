@@ -0,0 +1,123 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Metrics of the request being served. Context variables follow the request
+# into sync_to_async threads, where async views run their queries.
+_request_metrics = ContextVar('rr_request_metrics', default=None)
+
+
+class QueryMetrics:
+    """Database execute wrapper that counts queries and accumulates their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper that reports to the current request's metrics, if any"""
+    metrics = _request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recorder(db_connection):
+    if record_query not in db_connection.execute_wrappers:
+        db_connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_query_recorder_on_connect(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+class PerformanceMiddleware:
+    """Record wall time, SQL query count and DB time for every request.
+
+    The numbers are sent back as a Server-Timing header. Requests slower than
+    SLOW_REQUEST_THRESHOLD_MS are logged as one structured warning. Works in
+    both WSGI and ASGI mode, so async views keep a fully async stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_threshold_ms = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+        self.server_timing = getattr(settings, 'SERVER_TIMING_ENABLED', True)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # The connection may predate this module being loaded
+        install_query_recorder(connection)
+        metrics = QueryMetrics()
+        token = _request_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = QueryMetrics()
+        token = _request_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def finish(self, request, response, metrics, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = metrics.duration * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'app;dur={total_ms:.1f};desc="{view_name}", '
+                f'db;dur={db_ms:.1f};desc="{metrics.count} queries"'
+            )
+
+        if total_ms >= self.slow_threshold_ms:
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                'duration_ms': round(total_ms, 1),
+                'db_ms': round(db_ms, 1),
+                'queries': metrics.count,
+            }))
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{request.method} {request.path} ({view_name}) {response.status_code} "
+                         f"in {total_ms:.1f}ms, {metrics.count} queries in {db_ms:.1f}ms")
+
+        return response
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rr', '0003_alter_checklist_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='allow_networking',
+            field=models.BooleanField(default=True, help_text='Allow other users to follow this user'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Network',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following', to=settings.AUTH_USER_MODEL)),
+                ('following', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='followers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['follower', 'created_at'], name='rr_network_followe_5c47da_idx'), models.Index(fields=['following', 'created_at'], name='rr_network_followi_c7c5dd_idx')],
+                'unique_together': {('follower', 'following')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:29
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import TruncDate
+
+
+def backfill_local_date(apps, schema_editor):
+    """Key existing checklists by their UTC date, keeping the earliest one per user per day"""
+    Checklist = apps.get_model('rr', 'Checklist')
+    Checklist.objects.filter(local_date__isnull=True).update(local_date=TruncDate('created_at'))
+
+    earlier_same_day = Checklist.objects.filter(
+        user=OuterRef('user'),
+        local_date=OuterRef('local_date'),
+        id__lt=OuterRef('id'),
+    )
+    Checklist.objects.filter(Exists(earlier_same_day)).update(local_date=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rr', '0004_user_allow_networking_user_followers_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checklist',
+            name='local_date',
+            field=models.DateField(blank=True, help_text="Calendar date of the checklist in the user's timezone", null=True),
+        ),
+        migrations.AddField(
+            model_name='checklist',
+            name='utc_offset',
+            field=models.SmallIntegerField(default=0, help_text="User's UTC offset in minutes when the checklist was created"),
+        ),
+        migrations.RunPython(backfill_local_date, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='checklist',
+            constraint=models.UniqueConstraint(fields=('user', 'local_date'), name='rr_checklist_user_local_date_uniq'),
+        ),
+    ]
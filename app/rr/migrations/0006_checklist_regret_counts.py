@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_regret_counts(apps, schema_editor):
+    Checklist = apps.get_model('rr', 'Checklist')
+    Regret = apps.get_model('rr', 'Regret')
+    regrets = Regret.objects.filter(checklist=OuterRef('pk')).order_by().values('checklist')
+    Checklist.objects.update(
+        total_regrets=Coalesce(Subquery(regrets.annotate(n=Count('pk')).values('n')), 0),
+        incomplete_regrets=Coalesce(Subquery(regrets.filter(success=False).annotate(n=Count('pk')).values('n')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rr', '0005_checklist_local_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checklist',
+            name='incomplete_regrets',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='checklist',
+            name='total_regrets',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_regret_counts, migrations.RunPython.noop),
+    ]
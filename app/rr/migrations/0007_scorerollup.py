@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import Trunc
+
+
+def backfill_score_rollups(apps, schema_editor):
+    Checklist = apps.get_model('rr', 'Checklist')
+    ScoreRollup = apps.get_model('rr', 'ScoreRollup')
+    for period in ('day', 'week', 'month'):
+        aggregates = (
+            Checklist.objects.filter(local_date__isnull=False)
+            .annotate(period_start=Trunc('local_date', period, output_field=models.DateField()))
+            .order_by()
+            .values('user_id', 'period_start')
+            .annotate(mean_score=Avg('score'), checklist_count=Count('id'),
+                      total=Sum('total_regrets'), incomplete=Sum('incomplete_regrets'))
+        )
+        batch = []
+        for row in aggregates.iterator(chunk_size=5000):
+            batch.append(ScoreRollup(
+                user_id=row['user_id'], period=period, period_start=row['period_start'],
+                score=round(Decimal(row['mean_score']), 4), checklists=row['checklist_count'],
+                total_regrets=row['total'], incomplete_regrets=row['incomplete'],
+            ))
+            if len(batch) == 5000:
+                ScoreRollup.objects.bulk_create(batch)
+                batch = []
+        ScoreRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rr', '0006_checklist_regret_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('score', models.DecimalField(decimal_places=4, help_text='Mean checklist score over the period', max_digits=5)),
+                ('checklists', models.PositiveIntegerField(default=0)),
+                ('total_regrets', models.PositiveIntegerField(default=0)),
+                ('incomplete_regrets', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'period', 'period_start'), name='rr_scorerollup_user_period_start_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_score_rollups, migrations.RunPython.noop),
+    ]
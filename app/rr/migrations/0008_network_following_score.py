@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:48
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_following_scores(apps, schema_editor):
+    Checklist = apps.get_model('rr', 'Checklist')
+    Network = apps.get_model('rr', 'Network')
+    latest = Checklist.objects.filter(user=OuterRef('following')).order_by('-created_at')
+    Network.objects.update(
+        following_score=Subquery(latest.values('score')[:1]),
+        following_checklist_at=Subquery(latest.values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rr', '0007_scorerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='network',
+            name='following_checklist_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='network',
+            name='following_score',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=5, null=True),
+        ),
+        migrations.RunPython(backfill_following_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='network',
+            index=models.Index(fields=['follower', 'following_score', 'id'], name='rr_network_leaderboard_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+INDEX_NAME = 'rr_user_username_prefix_idx'
+
+
+def create_username_prefix_index(apps, schema_editor):
+    # Matches the UPPER(username::text) LIKE 'PREFIX%' that username__istartswith
+    # generates on PostgreSQL. text_pattern_ops makes LIKE prefixes indexable
+    # under any collation, and the partial predicate keeps only searchable users.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} '
+        f'ON rr_user (UPPER(username::text) text_pattern_ops) '
+        f'WHERE is_active AND allow_networking'
+    )
+
+
+def drop_username_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; it builds the
+    # index without blocking writes to the live user table
+    atomic = False
+
+    dependencies = [
+        ('rr', '0008_network_following_score'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_username_prefix_index, drop_username_prefix_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rr', '0009_user_username_prefix_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checklist',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Advanced whenever the checklist's regrets change"),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='checklists_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Advanced whenever any of the user's checklists change"),
+        ),
+    ]
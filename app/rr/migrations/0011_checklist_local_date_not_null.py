@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:12
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+
+def backfill_local_date(apps, schema_editor):
+    """Date the checklists 0005 left without a local date.
+
+    0005 keyed each user's first checklist of a UTC day by that date and left
+    the later ones null. Each of those takes the date of created_at shifted by
+    its utc_offset if free, else the day after its UTC date, else the day
+    before: a local date is always within a day of the UTC one. No date is
+    later than today, so no checklist is dated ahead of its day.
+
+    A checklist with none of those days free cannot be told apart from the
+    earlier checklist that already holds its day. It is deleted with its
+    regrets, and its id is reported.
+    """
+    Checklist = apps.get_model('rr', 'Checklist')
+    today = timezone.now().date()
+    taken = {}
+    dated_users = set()
+    dropped = []
+    undated = Checklist.objects.filter(local_date__isnull=True).order_by('user_id', 'created_at', 'id')
+    for checklist in undated.iterator():
+        if checklist.user_id not in taken:
+            taken[checklist.user_id] = set(
+                Checklist.objects.filter(user_id=checklist.user_id, local_date__isnull=False)
+                .values_list('local_date', flat=True)
+            )
+        user_dates = taken[checklist.user_id]
+        utc_date = checklist.created_at.date()
+        candidates = (
+            (checklist.created_at + timedelta(minutes=checklist.utc_offset)).date(),
+            utc_date + timedelta(days=1),
+            utc_date - timedelta(days=1),
+        )
+        local_date = next((day for day in candidates if day <= today and day not in user_dates), None)
+        if local_date is None:
+            dropped.append(checklist.pk)
+            continue
+        user_dates.add(local_date)
+        dated_users.add(checklist.user_id)
+        Checklist.objects.filter(pk=checklist.pk).update(local_date=local_date)
+
+    if dropped:
+        Checklist.objects.filter(pk__in=dropped).delete()
+        print(f"\n  Deleted {len(dropped)} checklists sharing a day with an earlier one: {dropped}")
+    if dated_users:
+        rebuild_score_rollups(apps, dated_users)
+
+
+def rebuild_score_rollups(apps, user_ids):
+    """Recompute the rollups of users whose checklists were dated above, as 0007 built them"""
+    Checklist = apps.get_model('rr', 'Checklist')
+    ScoreRollup = apps.get_model('rr', 'ScoreRollup')
+    ScoreRollup.objects.filter(user_id__in=user_ids).delete()
+    for period in ('day', 'week', 'month'):
+        aggregates = (
+            Checklist.objects.filter(user_id__in=user_ids, local_date__isnull=False)
+            .annotate(period_start=Trunc('local_date', period, output_field=models.DateField()))
+            .order_by()
+            .values('user_id', 'period_start')
+            .annotate(mean_score=Avg('score'), checklist_count=Count('id'),
+                      total=Sum('total_regrets'), incomplete=Sum('incomplete_regrets'))
+        )
+        ScoreRollup.objects.bulk_create(
+            ScoreRollup(
+                user_id=row['user_id'], period=period, period_start=row['period_start'],
+                score=round(Decimal(row['mean_score']), 4), checklists=row['checklist_count'],
+                total_regrets=row['total'], incomplete_regrets=row['incomplete'],
+            )
+            for row in aggregates.iterator(chunk_size=5000)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rr', '0010_version_stamps'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_local_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='checklist',
+            name='local_date',
+            field=models.DateField(help_text="Calendar date of the checklist in the user's timezone"),
+        ),
+    ]
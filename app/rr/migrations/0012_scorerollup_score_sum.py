@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:51
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Trunc
+
+
+def backfill_score_sum(apps, schema_editor):
+    """Sum the checklist scores of every existing rollup, one UPDATE per period"""
+    Checklist = apps.get_model('rr', 'Checklist')
+    ScoreRollup = apps.get_model('rr', 'ScoreRollup')
+    for period in ('day', 'week', 'month'):
+        sums = (
+            Checklist.objects
+            .annotate(period_start=Trunc('local_date', period, output_field=models.DateField()))
+            .filter(user_id=OuterRef('user_id'), period_start=OuterRef('period_start'))
+            .order_by()
+            .values('user_id')
+            .annotate(total=Sum('score'))
+            .values('total')
+        )
+        ScoreRollup.objects.filter(period=period).update(score_sum=Coalesce(Subquery(sums), 0, output_field=models.DecimalField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rr', '0011_checklist_local_date_not_null'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scorerollup',
+            name='score_sum',
+            field=models.DecimalField(decimal_places=4, default=0, help_text='Sum of checklist scores over the period', max_digits=12),
+        ),
+        migrations.RunPython(backfill_score_sum, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,13 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.contrib.auth.hashers import make_password
+from django.db import connections, models, transaction
 from django.utils import timezone
-from django.db.models.functions import ExtractDay, ExtractMonth, ExtractYear
+from django.db.models import Avg, Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, ExtractDay, ExtractMonth, ExtractYear, Trunc
 from django.core.exceptions import ValidationError
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
+from decimal import ROUND_HALF_UP, Decimal
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,28 +17,67 @@ class UserManager(BaseUserManager):
     def create_user(self, username, **extra_fields):
         if not username:
             raise ValidationError("Email must be set")
-        
-        logger.info(f"Creating user with username: {username}")
-        logger.info(f"Extra fields before setdefault: {extra_fields}")
-        
-        extra_fields.setdefault('is_active', True)
-        logger.info(f"Extra fields after setdefault: {extra_fields}")
-        
-        user = self.model(username=username, **extra_fields)
-        logger.info(f"User object created, is_active = {user.is_active}")
-        
-        user.save(using=self._db)
-        logger.info(f"User saved to database, is_active = {user.is_active}")
 
         # Set the password if provided in extra_fields - required for superuser
         password = extra_fields.pop('password', None)
+        extra_fields.setdefault('is_active', True)
+
+        user = self.model(username=username, **extra_fields)
         if password:
             user.set_password(password)
         else:
             user.set_unusable_password()
-        
+        user.save(using=self._db)
+        logger.debug(f"Created user {user.id} ({username})")
+
         return user
 
+    def login_or_register(self, username, **defaults):
+        """Return (user, created) for a username, creating the user with defaults if needed.
+
+        On PostgreSQL this is a single INSERT ... ON CONFLICT DO NOTHING
+        statement that returns either the new or the existing row, so
+        concurrent signups of the same name cannot fail. Other databases
+        fall back to get_or_create.
+        """
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            return self.get_or_create(
+                username=username,
+                defaults={**defaults, 'password': make_password(None), 'is_active': True},
+            )
+
+        user = self.model(username=username, **defaults, is_active=True)
+        user.set_unusable_password()
+        meta = self.model._meta
+        fields = [field for field in meta.concrete_fields if not field.primary_key]
+        quote = connection.ops.quote_name
+        table = quote(meta.db_table)
+        columns = ', '.join(quote(field.column) for field in fields)
+        selected = ', '.join(quote(field.column) for field in meta.concrete_fields)
+        values = [field.get_db_prep_save(field.pre_save(user, True), connection) for field in fields]
+        placeholders = ', '.join(['%s'] * len(fields))
+        username_column = quote(meta.get_field('username').column)
+
+        # The outer SELECT reads the snapshot taken before the insert, so exactly
+        # one branch of the UNION returns a row
+        sql = (
+            f"WITH inserted AS ("
+            f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({username_column}) DO NOTHING RETURNING {selected}"
+            f") "
+            f"SELECT {selected}, true AS created FROM inserted "
+            f"UNION ALL "
+            f"SELECT {selected}, false AS created FROM {table} WHERE {username_column} = %s"
+        )
+        rows = list(self.raw(sql, [*values, username]).using(self.db))
+        if not rows:
+            # A concurrent transaction inserted the name after this statement's
+            # snapshot was taken; its row is visible to a new statement
+            return self.get(username=username), False
+        user = rows[0]
+        return user, user.created
+
     def create_superuser(self, username, **extra_fields):
         extra_fields.setdefault("is_staff", True)
         extra_fields.setdefault("is_superuser", True)
@@ -56,6 +98,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     allow_networking = models.BooleanField(default=True, help_text="Allow other users to follow this user")
     followers_count = models.PositiveIntegerField(default=0)
     following_count = models.PositiveIntegerField(default=0)
+    checklists_version = models.PositiveIntegerField(default=0, editable=False, help_text="Advanced whenever any of the user's checklists change")
 
     objects = UserManager()
 
@@ -71,7 +114,7 @@ class User(AbstractBaseUser, PermissionsMixin):
         
         try:
             checklist = self.user_checklists.filter(
-                created_at__date=date
+                local_date=date
             ).first()
             
             if checklist:
@@ -81,6 +124,21 @@ class User(AbstractBaseUser, PermissionsMixin):
             logger.error(f"Error calculating regret index for user {self.id}: {e}")
             return -1  # Error case also returns -1
     
+    @staticmethod
+    def network_count_expressions():
+        """(followers, following) expressions counting a user's Network rows, for annotate() or update()"""
+        followers = Network.objects.filter(following=OuterRef('pk')).order_by().values('following')
+        following = Network.objects.filter(follower=OuterRef('pk')).order_by().values('follower')
+        return (
+            Coalesce(Subquery(followers.annotate(n=Count('pk')).values('n')), 0),
+            Coalesce(Subquery(following.annotate(n=Count('pk')).values('n')), 0),
+        )
+
+    @classmethod
+    def touch_checklists(cls, user_ids):
+        """Mark the checklists of the given users as changed, so conditional requests see new content"""
+        return cls.objects.filter(id__in=user_ids).update(checklists_version=F('checklists_version') + 1)
+
     def refresh_counts(self):
         """Refresh follower and following counts from actual relationships"""
         try:
@@ -92,10 +150,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     def save(self, *args, **kwargs):
         """Override save to ensure counts are valid"""
-        # Ensure counts are never negative
-        if self.followers_count < 0:
+        # Ensure counts are never negative; deferred counts (e.g. on the cached
+        # authenticated user) are not loaded just to check them
+        deferred = self.get_deferred_fields()
+        if 'followers_count' not in deferred and self.followers_count < 0:
             self.followers_count = 0
-        if self.following_count < 0:
+        if 'following_count' not in deferred and self.following_count < 0:
             self.following_count = 0
         
         super().save(*args, **kwargs)
@@ -104,17 +164,96 @@ class User(AbstractBaseUser, PermissionsMixin):
 class Checklist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_checklists')
     created_at = models.DateTimeField(default=timezone.now)
+    local_date = models.DateField(help_text="Calendar date of the checklist in the user's timezone")
+    utc_offset = models.SmallIntegerField(default=0, help_text="User's UTC offset in minutes when the checklist was created")
     score = models.DecimalField(decimal_places=4, max_digits=5, default=1.0, validators=[MinValueValidator(limit_value=0), MaxValueValidator(limit_value=1)])
     completed = models.BooleanField(default=False)
+    total_regrets = models.PositiveIntegerField(default=0)
+    incomplete_regrets = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=0, editable=False, help_text="Advanced whenever the checklist's regrets change")
 
     class Meta:
         indexes = [
             models.Index(fields=['user', 'created_at'])
         ]
+        constraints = [
+            # One checklist per user per local day; also serves as the lookup index
+            models.UniqueConstraint(fields=['user', 'local_date'], name='rr_checklist_user_local_date_uniq'),
+        ]
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
 
+    @classmethod
+    def adjust_regret_counts(cls, checklist_id, total_delta=0, incomplete_delta=0):
+        """Apply regret count deltas and rescore the checklist in a single UPDATE.
+
+        The checklist row is locked first, so the score change is known exactly
+        and folded into the user's rollups (ScoreRollup.apply_delta). Also
+        advances the version stamps of the checklist and of its user's
+        checklists. Returns the number of checklists updated.
+        """
+        with transaction.atomic():
+            current = cls._lock_counts(checklist_id)
+            if current is None:
+                return 0
+            return cls._write_counts(
+                checklist_id,
+                current,
+                current['total_regrets'] + total_delta,
+                current['incomplete_regrets'] + incomplete_delta,
+            )
+
+    @classmethod
+    def _lock_counts(cls, checklist_id):
+        return (
+            cls.objects.select_for_update()
+            .filter(pk=checklist_id)
+            .values('user_id', 'local_date', 'score', 'completed', 'total_regrets', 'incomplete_regrets')
+            .first()
+        )
+
+    @classmethod
+    def _write_counts(cls, checklist_id, current, total, incomplete):
+        # Score is the ratio of incomplete regrets; completed checklists keep their score
+        # and a checklist left without regrets keeps its last score
+        score = current['score']
+        if not current['completed'] and total > 0:
+            score = (Decimal(incomplete) / total).quantize(Decimal('0.0001'), rounding=ROUND_HALF_UP)
+        updated = cls.objects.filter(pk=checklist_id).update(
+            total_regrets=total,
+            incomplete_regrets=incomplete,
+            score=score,
+            version=F('version') + 1,
+        )
+        User.objects.filter(pk=current['user_id']).update(checklists_version=F('checklists_version') + 1)
+        ScoreRollup.apply_delta(
+            current['user_id'],
+            current['local_date'],
+            score=score - current['score'],
+            total_regrets=total - current['total_regrets'],
+            incomplete_regrets=incomplete - current['incomplete_regrets'],
+        )
+        return updated
+
+    @classmethod
+    def touch(cls, checklist_id):
+        """Advance the version stamp of a checklist whose regrets changed without affecting the score"""
+        return cls.objects.filter(pk=checklist_id).update(version=F('version') + 1)
+
+    @classmethod
+    def refresh_regret_counts(cls, checklist_id):
+        """Recount a checklist's regrets from scratch, for when deltas are unknown"""
+        with transaction.atomic():
+            current = cls._lock_counts(checklist_id)
+            if current is None:
+                return 0
+            counts = Regret.objects.filter(checklist_id=checklist_id).aggregate(
+                total=Count('pk'),
+                incomplete=Count('pk', filter=models.Q(success=False)),
+            )
+            return cls._write_counts(checklist_id, current, counts['total'], counts['incomplete'])
+
 
 class Regret(models.Model):
     checklist = models.ForeignKey(Checklist, on_delete=models.CASCADE, related_name='checklist_regrets')
@@ -122,18 +261,30 @@ class Regret(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     success = models.BooleanField(default=False)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored success flag so saves can be turned into count deltas
+        instance._loaded_success = instance.__dict__.get('success')
+        return instance
+
 
 class Network(models.Model):
     """Network relationship between users (following/followers)"""
     follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
     following = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')
     created_at = models.DateTimeField(default=timezone.now)
+    # Copy of the followed user's latest checklist, kept current for the leaderboard
+    following_score = models.DecimalField(decimal_places=4, max_digits=5, null=True, blank=True)
+    following_checklist_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         unique_together = ('follower', 'following')
         indexes = [
             models.Index(fields=['follower', 'created_at']),
             models.Index(fields=['following', 'created_at']),
+            # Serves the leaderboard: a follower's edges in score order
+            models.Index(fields=['follower', 'following_score', 'id'], name='rr_network_leaderboard_idx'),
         ]
     
     def __str__(self):
@@ -146,6 +297,10 @@ class Network(models.Model):
             raise ValidationError("Users cannot follow themselves")
         
         is_new = self.pk is None
+        if is_new and self.following_checklist_at is None:
+            latest = Checklist.objects.filter(user_id=self.following_id).order_by('-created_at').values_list('score', 'created_at').first()
+            if latest:
+                self.following_score, self.following_checklist_at = latest
         super().save(*args, **kwargs)
         
         if is_new:
@@ -158,6 +313,56 @@ class Network(models.Model):
                 following_count=F('following_count') + 1
             )
     
+    @classmethod
+    def follow_many(cls, follower_id, following_ids):
+        """Create follow edges from one user in bulk; returns the ids actually followed.
+
+        Edges that already exist are skipped by the unique constraint. Counts
+        are updated with two set-based UPDATEs. The caller validates targets
+        (self-follow, allow_networking) and should run this in a transaction.
+        """
+        if not following_ids:
+            return []
+        # Rows of this batch share one timestamp, which tells them apart from
+        # edges created concurrently, since ignore_conflicts returns no ids
+        batch_time = timezone.now()
+        cls.objects.bulk_create(
+            [cls(follower_id=follower_id, following_id=following_id, created_at=batch_time) for following_id in following_ids],
+            ignore_conflicts=True,
+        )
+        followed_ids = list(
+            cls.objects.filter(follower_id=follower_id, following_id__in=following_ids, created_at=batch_time)
+            .values_list('following_id', flat=True)
+        )
+        if followed_ids:
+            cls.refresh_following_scores(cls.objects.filter(follower_id=follower_id, following_id__in=followed_ids))
+            User.objects.filter(id__in=followed_ids).update(followers_count=F('followers_count') + 1)
+            User.objects.filter(id=follower_id).update(following_count=F('following_count') + len(followed_ids))
+        return followed_ids
+
+    @classmethod
+    def refresh_following_scores(cls, edges):
+        """Copy each followed user's latest checklist onto the given edges (a Network queryset) in one UPDATE"""
+        latest = Checklist.objects.filter(user=OuterRef('following')).order_by('-created_at')
+        return edges.update(
+            following_score=Subquery(latest.values('score')[:1]),
+            following_checklist_at=Subquery(latest.values('created_at')[:1]),
+        )
+
+    @classmethod
+    def update_following_score(cls, user_id):
+        """Propagate a user's latest checklist to the edges of everyone following them"""
+        latest = Checklist.objects.filter(user_id=user_id).order_by('-created_at').values_list('score', 'created_at').first()
+        if latest is None:
+            return 0
+        score, created_at = latest
+        # Rows that are already current are not rewritten
+        return (
+            cls.objects.filter(following_id=user_id)
+            .exclude(following_score=score, following_checklist_at=created_at)
+            .update(following_score=score, following_checklist_at=created_at)
+        )
+
     def delete(self, *args, **kwargs):
         """Override delete to update user counts"""
         # Store references before deletion
@@ -178,3 +383,144 @@ class Network(models.Model):
         # Ensure counts never go below 0
         User.objects.filter(id=following_id, followers_count__lt=0).update(followers_count=0)
         User.objects.filter(id=follower_id, following_count__lt=0).update(following_count=0)
+
+
+class ScoreRollup(models.Model):
+    """Per-user checklist aggregates for a local day, week (from Monday) or month.
+
+    Regret writes fold their score and count changes into the rows with
+    apply_delta(); ScoreRollup.refresh() recomputes them after a checklist is
+    saved. Score history is then a range read on the unique index.
+    """
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+    PERIOD_CHOICES = [(DAY, 'Day'), (WEEK, 'Week'), (MONTH, 'Month')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='score_rollups')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    score = models.DecimalField(decimal_places=4, max_digits=5, help_text="Mean checklist score over the period")
+    score_sum = models.DecimalField(decimal_places=4, max_digits=12, default=0, help_text="Sum of checklist scores over the period")
+    checklists = models.PositiveIntegerField(default=0)
+    total_regrets = models.PositiveIntegerField(default=0)
+    incomplete_regrets = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # Also serves history range reads
+            models.UniqueConstraint(fields=['user', 'period', 'period_start'], name='rr_scorerollup_user_period_start_uniq'),
+        ]
+
+    @classmethod
+    def period_start_for(cls, period, day):
+        if period == cls.WEEK:
+            return day - timedelta(days=day.weekday())
+        if period == cls.MONTH:
+            return day.replace(day=1)
+        return day
+
+    @classmethod
+    def period_end_for(cls, period, start):
+        """First day after the period beginning at start"""
+        if period == cls.WEEK:
+            return start + timedelta(days=7)
+        if period == cls.MONTH:
+            return (start + timedelta(days=32)).replace(day=1)
+        return start + timedelta(days=1)
+
+    @classmethod
+    def apply_delta(cls, user_id, local_date, score=0, total_regrets=0, incomplete_regrets=0):
+        """Add a checklist's score and regret count changes to its day, week and month rollups in one UPDATE.
+
+        Rollups not yet created are left to ScoreRollup.refresh().
+        """
+        if local_date is None or not (score or total_regrets or incomplete_regrets):
+            return 0
+        periods = models.Q()
+        for period, _ in cls.PERIOD_CHOICES:
+            periods |= models.Q(period=period, period_start=cls.period_start_for(period, local_date))
+        score_sum = F('score_sum') + score
+        return cls.objects.filter(periods, user_id=user_id).update(
+            score_sum=score_sum,
+            score=Cast(Cast(score_sum, models.FloatField()) / F('checklists'), models.DecimalField(decimal_places=4, max_digits=5)),
+            total_regrets=F('total_regrets') + total_regrets,
+            incomplete_regrets=F('incomplete_regrets') + incomplete_regrets,
+        )
+
+    @classmethod
+    def refresh(cls, user_ids, local_dates):
+        """Recompute the rollups of the given users for every period containing one of the dates.
+
+        One aggregate query per period and one upsert, however many users are
+        given. Rollups of periods left without checklists are deleted. The
+        checklists are locked first, so no concurrent apply_delta() is lost.
+        """
+        local_dates = {day for day in local_dates if day is not None}
+        if not user_ids or not local_dates:
+            return
+        with transaction.atomic():
+            cls._refresh(user_ids, local_dates)
+
+    @classmethod
+    def _refresh(cls, user_ids, local_dates):
+        # Weeks and months together span every period containing one of the dates
+        periods = [(period, cls.period_start_for(period, day)) for period in (cls.WEEK, cls.MONTH) for day in local_dates]
+        list(
+            Checklist.objects.select_for_update()
+            .filter(
+                user_id__in=user_ids,
+                local_date__gte=min(start for _, start in periods),
+                local_date__lt=max(cls.period_end_for(period, start) for period, start in periods),
+            )
+            .values_list('pk', flat=True)
+        )
+        refreshed_at = timezone.now()
+        rollups = []
+        stale = models.Q()
+        for period, _ in cls.PERIOD_CHOICES:
+            starts = {cls.period_start_for(period, day) for day in local_dates}
+            stale |= models.Q(period=period, period_start__in=starts)
+            aggregates = (
+                Checklist.objects
+                .filter(
+                    user_id__in=user_ids,
+                    local_date__gte=min(starts),
+                    local_date__lt=cls.period_end_for(period, max(starts)),
+                )
+                .annotate(period_start=Trunc('local_date', period, output_field=models.DateField()))
+                .filter(period_start__in=starts)
+                .order_by()
+                .values('user_id', 'period_start')
+                .annotate(
+                    mean_score=Avg('score'),
+                    score_total=Sum('score'),
+                    checklist_count=Count('id'),
+                    total=Sum('total_regrets'),
+                    incomplete=Sum('incomplete_regrets'),
+                )
+            )
+            rollups.extend(
+                cls(
+                    user_id=row['user_id'],
+                    period=period,
+                    period_start=row['period_start'],
+                    score=round(Decimal(row['mean_score']), 4),
+                    score_sum=row['score_total'],
+                    checklists=row['checklist_count'],
+                    total_regrets=row['total'],
+                    incomplete_regrets=row['incomplete'],
+                    refreshed_at=refreshed_at,
+                )
+                for row in aggregates
+            )
+
+        cls.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['user', 'period', 'period_start'],
+            update_fields=['score', 'score_sum', 'checklists', 'total_regrets', 'incomplete_regrets', 'refreshed_at'],
+        )
+        # Periods that no longer have checklists were not upserted above
+        cls.objects.filter(stale, user_id__in=user_ids, refreshed_at__lt=refreshed_at).delete()
@@ -0,0 +1,137 @@
+import binascii
+import json
+from base64 import b64decode, b64encode
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class ChecklistCursorPagination(CursorPagination):
+    """Keyset pagination over a user's checklists, newest first.
+
+    Each page is a range scan on the (user, created_at) index.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class NetworkCursorPagination(CursorPagination):
+    """Keyset pagination over network edges, most recent follow first.
+
+    Each page is a range scan on the (follower, created_at) or
+    (following, created_at) index, depending on the list type.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class KeysetCursorPagination(BasePagination):
+    """Keyset pagination positioned on every ordering field, not just the first.
+
+    DRF's CursorPagination keeps only the first ordering field in its cursor and
+    steps over ties with an OFFSET, capped at offset_cutoff, so it cannot page
+    through a low-cardinality column. Here the cursor holds the values of all
+    ordering fields and a page is the rows strictly after them in that order.
+
+    All ordering fields must sort in the same direction, must not be null, and
+    the last one must be unique. Rows may be model instances or values() dicts.
+    """
+    ordering = None
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        fields = [field.lstrip('-') for field in self.ordering]
+        # Walking backwards (towards the previous page) flips every comparison
+        descending = self.ordering[0].startswith('-') != reverse
+        if position is not None:
+            queryset = queryset.filter(self._after(fields, position, descending))
+        ordering = [f'-{field}' if descending else field for field in fields]
+
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.fields = fields
+        self.page = rows
+        return rows
+
+    @staticmethod
+    def _after(fields, position, descending):
+        """Rows past position in (field, ...) order.
+
+        The leading range on the first field bounds the index scan; the rest
+        of the condition only resolves ties.
+        """
+        op = 'lt' if descending else 'gt'
+        condition = Q(**{f'{fields[-1]}__{op}': position[-1]})
+        for field, value in zip(reversed(fields[:-1]), reversed(position[:-1])):
+            condition = Q(**{f'{field}__{op}': value}) | (Q(**{field: value}) & condition)
+        return Q(**{f'{fields[0]}__{op}e': position[0]}) & condition
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii'), altchars=b'-_'))
+            position, reverse = cursor['p'], bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, row, reverse):
+        position = [row[field] if isinstance(row, dict) else getattr(row, field) for field in self.fields]
+        cursor = {'p': position, 'r': 1} if reverse else {'p': position}
+        encoded = b64encode(json.dumps(cursor, default=str, separators=(',', ':')).encode(), altchars=b'-_').decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class LeaderboardCursorPagination(KeysetCursorPagination):
+    """Keyset pagination over a follower's edges by the followed user's score, lowest first.
+
+    Each page is a range scan on the (follower, following_score, id) index,
+    however many users share a score.
+    """
+    ordering = ('following_score', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
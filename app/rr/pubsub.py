@@ -0,0 +1,167 @@
+"""
+Publish/subscribe of live events to streaming (SSE) clients.
+
+The broker class is chosen by the PUBSUB_BROKER setting:
+
+* InProcessBroker (default) delivers to subscribers in the same process
+  only. It is enough for one worker or for development.
+* RedisBroker fans messages out through Redis pub/sub, so a score change
+  handled by one gunicorn worker reaches clients connected to any other.
+
+Publishing is synchronous, because it is called from signal receivers on the
+write path. Subscribing is async, because it is used by streaming views on
+the event loop. Messages are JSON-serializable dicts.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessBroker:
+    """Fan messages out to asyncio queues of subscribers in this process"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}  # topic -> {(loop, queue)}
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, topic):
+        return bool(self._subscribers.get(topic))
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for loop, queue in subscribers:
+            # Publishers run in worker threads; queues belong to the event loop
+            loop.call_soon_threadsafe(self._deliver, queue, topic, message)
+
+    @staticmethod
+    def _deliver(queue, topic, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A slow client misses events rather than growing memory without bound
+            logger.warning(f"Dropped event on {topic} for a slow subscriber")
+
+    @asynccontextmanager
+    async def subscribe(self, topics):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            for topic in topics:
+                self._subscribers.setdefault(topic, set()).add(subscriber)
+        try:
+            yield InProcessSubscription(subscriber[1])
+        finally:
+            with self._lock:
+                for topic in topics:
+                    subscribers = self._subscribers.get(topic)
+                    if subscribers is not None:
+                        subscribers.discard(subscriber)
+                        if not subscribers:
+                            del self._subscribers[topic]
+
+
+class InProcessSubscription:
+    def __init__(self, queue):
+        self._queue = queue
+
+    async def get(self, timeout):
+        """Next message, or None if none arrives within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RedisBroker:
+    """Fan messages out through Redis pub/sub channels, across processes"""
+
+    def __init__(self, url=None, channel_prefix='rr:events:', subscriber_check_ttl=None):
+        import redis
+
+        self.url = url or settings.PUBSUB_REDIS_URL
+        self.channel_prefix = channel_prefix
+        self._client = redis.Redis.from_url(self.url)
+        if subscriber_check_ttl is None:
+            subscriber_check_ttl = getattr(settings, 'PUBSUB_SUBSCRIBER_CHECK_TTL', 1.0)
+        self.subscriber_check_ttl = subscriber_check_ttl
+        self._subscriber_counts = {}  # topic -> (count, expires_at)
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, topic):
+        """Whether any process subscribes to topic, per PUBSUB NUMSUB.
+
+        Counts are remembered for subscriber_check_ttl seconds, so a burst of
+        writes costs one Redis round trip, and a client that has just
+        connected may miss events for up to that long.
+        """
+        now = time.monotonic()
+        with self._lock:
+            count, expires_at = self._subscriber_counts.get(topic, (0, 0))
+        if expires_at <= now:
+            [(_, count)] = self._client.pubsub_numsub(self.channel_prefix + topic)
+            with self._lock:
+                if len(self._subscriber_counts) > 10000:
+                    self._subscriber_counts.clear()
+                self._subscriber_counts[topic] = (count, now + self.subscriber_check_ttl)
+        return count > 0
+
+    def publish(self, topic, message):
+        self._client.publish(self.channel_prefix + topic, json.dumps(message))
+
+    @asynccontextmanager
+    async def subscribe(self, topics):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            if topics:
+                await pubsub.subscribe(*(self.channel_prefix + topic for topic in topics))
+            yield RedisSubscription(pubsub, bool(topics))
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+class RedisSubscription:
+    def __init__(self, pubsub, subscribed):
+        self._pubsub = pubsub
+        self._subscribed = subscribed
+
+    async def get(self, timeout):
+        """Next message, or None if none arrives within timeout seconds"""
+        if not self._subscribed:
+            await asyncio.sleep(timeout)
+            return None
+        message = await self._pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker configured by PUBSUB_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'PUBSUB_BROKER', 'rr.pubsub.InProcessBroker'))()
+    return _broker
+
+
+def score_topic(user_id):
+    """Topic of checklist score changes of one user"""
+    return f"score:{user_id}"
@@ -0,0 +1,77 @@
+"""
+Username prefix search for network discovery.
+
+Matches come from an indexed case-insensitive prefix scan. The partial index
+rr_user_username_prefix_idx (PostgreSQL) covers only active users who allow
+networking. Matches are ranked in SQL (shortest username first, so an exact
+match leads, then the most followed) and at most SEARCH_CANDIDATES ranked rows
+are read per prefix. Ranked results of hot prefixes are kept in a small
+per-process LRU for SEARCH_PREFIX_CACHE_TTL seconds, so a search-as-you-type
+box does not query for every keystroke of a popular prefix.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.functions import Length, Lower
+
+from .models import User
+
+SEARCH_CANDIDATES = 200
+
+
+class PrefixCache:
+    """Thread-safe LRU of prefix -> results whose entries expire after ttl seconds"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, prefix):
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry is None:
+                return None
+            stored_at, results = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[prefix]
+                return None
+            self._entries.move_to_end(prefix)
+            return results
+
+    def set(self, prefix, results):
+        with self._lock:
+            self._entries[prefix] = (time.monotonic(), results)
+            self._entries.move_to_end(prefix)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+prefix_cache = PrefixCache(
+    getattr(settings, 'SEARCH_PREFIX_CACHE_SIZE', 1024),
+    getattr(settings, 'SEARCH_PREFIX_CACHE_TTL', 30),
+)
+
+
+def search_usernames(prefix):
+    """Ranked searchable users whose username starts with prefix (case-insensitive)"""
+    prefix = prefix.lower()
+    results = prefix_cache.get(prefix)
+    if results is not None:
+        return results
+
+    # Every match starts with prefix, so the shortest usernames are the exact matches
+    results = list(
+        User.objects.filter(username__istartswith=prefix, is_active=True, allow_networking=True)
+        .order_by(Length('username'), '-followers_count', Lower('username'))
+        .values('id', 'username', 'followers_count')[:SEARCH_CANDIDATES]
+    )
+    prefix_cache.set(prefix, results)
+    return results
@@ -1,6 +1,11 @@
+import logging
+
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from .models import *
+from .tokens import RetainedRefreshToken
+
+logger = logging.getLogger(__name__)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -13,7 +18,7 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['is_active', 'followers_count', 'following_count']
 
     def get_tokens(self, user):
-        refresh = RefreshToken.for_user(user)
+        refresh = RetainedRefreshToken.for_user(user)
         return {
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -25,22 +30,36 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
+class LoginOrRegisterSerializer(serializers.ModelSerializer):
+    """Login or signup input; allow_networking only applies when the user is created"""
+
+    class Meta:
+        model = User
+        fields = ['username', 'allow_networking']
+        # An existing username logs in rather than failing the unique check
+        extra_kwargs = {'username': {'validators': []}}
+
+
+class RetainedTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh that checks the bounded blacklist (see rr.tokens)"""
+    token_class = RetainedRefreshToken
+
+
 class ChecklistSerializer(serializers.ModelSerializer):
     score = serializers.SerializerMethodField()  # Use custom method for better control
     
     class Meta:
         model = Checklist
-        fields = '__all__'
+        # The version stamp only feeds ETags (rr.conditional)
+        exclude = ['version']
     
     def get_score(self, obj):
         """Custom score handling to preserve decimal precision"""
         try:
             # Convert to float and preserve precision
-            score_value = float(obj.score)
-            print(f"DEBUG: Checklist {obj.id} - DB score: {obj.score}, Type: {type(obj.score)}, Converted: {score_value}")
-            return score_value
+            return float(obj.score)
         except Exception as e:
-            print(f"DEBUG: Error converting score for checklist {obj.id}: {e}")
+            logger.warning(f"Error converting score for checklist {obj.id}: {e}")
             return 1.0  # Fallback
 
 
@@ -52,6 +71,15 @@ class RegretSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+# Output keys of ChecklistSerializer and RegretSerializer, in order. List views
+# send values() rows with these keys instead of serializing model instances;
+# the renderers encode their dates and decimals the same way.
+CHECKLIST_ROW_FIELDS = (
+    'id', 'score', 'created_at', 'local_date', 'utc_offset', 'completed', 'total_regrets', 'incomplete_regrets', 'user',
+)
+REGRET_ROW_FIELDS = ('id', 'description', 'created_at', 'success')
+
+
 class NetworkSerializer(serializers.ModelSerializer):
     follower_username = serializers.CharField(source='follower.username', read_only=True)
     following_username = serializers.CharField(source='following.username', read_only=True)
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import importlib.util
 import os
 from pathlib import Path
 
@@ -29,7 +30,8 @@ load_dotenv(dotenv_path=env_path)
 SECRET_KEY = os.environ.get("SECRET_KEY")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Production deployments use rr.settings_production, which forces this off
+DEBUG = os.environ.get('DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = ['*']
 
@@ -61,6 +63,7 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    'rr.middleware.PerformanceMiddleware',  # first, so timings cover the whole stack
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,6 +73,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request instrumentation (rr.middleware.PerformanceMiddleware)
+SLOW_REQUEST_THRESHOLD_MS = float(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 500))
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', '1') == '1'
+
 ROOT_URLCONF = 'rr.urls'
 
 TEMPLATES = [
@@ -101,9 +108,84 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        # Validate a reused (or pooled) connection before handing it to a request
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Connection pool (psycopg 3). Each worker process holds its own pool, so the
+# database sees at most WEB_CONCURRENCY * DB_POOL_MAX_SIZE connections.
+# Requests wait up to DB_POOL_TIMEOUT seconds for a free connection.
+# With DB_POOL_ENABLED=0, connections persist for DB_CONN_MAX_AGE seconds instead.
+if os.environ.get('DB_POOL_ENABLED', '1') == '1':
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per process; point CACHE_REDIS_URL at a shared Redis when
+# running several workers so invalidations reach all of them.
+
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'rr-default',
+        }
+    }
+
+# Seconds a cached network list page lives without being invalidated
+NETWORK_LIST_CACHE_TIMEOUT = int(os.environ.get('NETWORK_LIST_CACHE_TIMEOUT', 300))
+
+# Network list ETags come from cache generations, which only reach every worker
+# through a shared cache; with per-process memory they could validate stale pages
+NETWORK_LIST_ETAGS = bool(os.environ.get('CACHE_REDIS_URL'))
+
+# Seconds an authenticated user is served from the cache instead of the database
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 60))
+
+# In-memory follow graph (rr.graph): seconds before a worker picks up follow
+# changes made by other workers, and local changes that force a rebuild
+FOLLOW_GRAPH_MAX_STALENESS = int(os.environ.get('FOLLOW_GRAPH_MAX_STALENESS', 60))
+FOLLOW_GRAPH_MAX_OVERLAY = int(os.environ.get('FOLLOW_GRAPH_MAX_OVERLAY', 10000))
+
+# Per-process cache of hot username search prefixes (rr.search)
+SEARCH_PREFIX_CACHE_SIZE = int(os.environ.get('SEARCH_PREFIX_CACHE_SIZE', 1024))
+SEARCH_PREFIX_CACHE_TTL = int(os.environ.get('SEARCH_PREFIX_CACHE_TTL', 30))
+
+# Broker of live events for streaming endpoints (rr.pubsub). The in-process
+# broker only reaches clients connected to the same worker, so Redis is used
+# whenever one is configured.
+PUBSUB_REDIS_URL = os.environ.get('PUBSUB_REDIS_URL', os.environ.get('CACHE_REDIS_URL'))
+PUBSUB_BROKER = os.environ.get(
+    'PUBSUB_BROKER', 'rr.pubsub.RedisBroker' if PUBSUB_REDIS_URL else 'rr.pubsub.InProcessBroker'
+)
+
+# Seconds the Redis broker remembers whether a topic has subscribers, so score
+# writes nobody streams skip the publish without a Redis round trip each
+PUBSUB_SUBSCRIBER_CHECK_TTL = float(os.environ.get('PUBSUB_SUBSCRIBER_CHECK_TTL', 1))
+
+# Seconds between keep-alive comments on event streams, and before a stream is
+# closed so the client reconnects (and picks up follows made meanwhile)
+EVENT_STREAM_KEEPALIVE = int(os.environ.get('EVENT_STREAM_KEEPALIVE', 15))
+EVENT_STREAM_MAX_DURATION = int(os.environ.get('EVENT_STREAM_MAX_DURATION', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -151,11 +233,19 @@ AUTH_USER_MODEL = 'rr.User'
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rr.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',  # for forms testing
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rr.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# MessagePack responses for clients that send Accept: application/msgpack
+if importlib.util.find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('rr.renderers.MessagePackRenderer')
+
 # JWT Settings
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -163,4 +253,41 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=36500),  # ~100 years, effectively never expires
     'ROTATE_REFRESH_TOKENS': True,  # Get a new refresh token when refreshing access token
     'BLACKLIST_AFTER_ROTATION': True,  # Blacklist old refresh tokens after rotation for security
+    'TOKEN_REFRESH_SERIALIZER': 'rr.serializers.RetainedTokenRefreshSerializer',
+}
+
+# Blacklisted refresh tokens older than this are deleted by prune_token_blacklist.
+# Tokens issued before the window are only accepted while their row exists.
+REFRESH_TOKEN_RETENTION = timedelta(days=int(os.environ.get('REFRESH_TOKEN_RETENTION_DAYS', 30)))
+
+# Blacklisted token ids remembered per process to reject replays without a query
+BLACKLISTED_JTI_CACHE_SIZE = int(os.environ.get('BLACKLISTED_JTI_CACHE_SIZE', 10000))
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+# Set LOG_LEVEL=DEBUG to see per-request timings and view debug output
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '{asctime} {levelname} {name} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'rr': {
+            'handlers': ['console'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
 }
@@ -0,0 +1,14 @@
+"""
+Production settings for rr project.
+
+Select with DJANGO_SETTINGS_MODULE=rr.settings_production. Everything not
+overridden here comes from rr.settings.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+
+# Debug off: no tracebacks in responses and no per-request SQL query log in memory
+DEBUG = False
+
+ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '*').split(',')
@@ -1,31 +1,233 @@
-from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 import logging
 
-from .models import Regret
+import pytz
+
+from .authentication import AUTH_USER_FIELDS, invalidate_cached_user
+from .background import run_after_commit
+from .caching import invalidate_lists_containing, invalidate_network_lists
+from .graph import bump_version, follow_graph
+from .models import Checklist, Network, Regret, ScoreRollup, User
+from .pubsub import get_broker, score_topic
 
 logger = logging.getLogger(__name__)
 
+# Sent whenever a checklist's score or regret counts change, including from
+# bulk write paths that bypass post_save. Provides checklist_id, user_id and
+# optionally the checklist's local_date.
+checklist_score_changed = Signal()
+
+# Sent after follow edges are created in bulk, which bypasses post_save.
+# Provides follower_id and following_ids.
+follows_created = Signal()
+
+# User fields shown in other users' network lists
+NETWORK_LIST_USER_FIELDS = {'username', 'allow_networking', 'followers_count', 'following_count'}
+
+
 @receiver(post_save, sender=Regret)
-def update_checklist_score(sender, instance, **kwargs) -> None:
-    logger.info(f"Signal triggered for Regret {instance.id}")
-    checklist = instance.checklist
-    
-    # Don't allow scores to be updated if the checklist is already completed
-    if checklist.completed:
-        logger.info(f"Checklist {checklist.id} is completed, skipping score update")
-        return
-    
-    # Recalculate checklist score, considering all regrets
-    regrets = checklist.checklist_regrets.all()
-    total_regrets = regrets.count()
-    
-    if total_regrets > 0:
-        # Count incomplete tasks (where success is False)
-        incomplete_regrets = sum(1 for regret in regrets if not regret.success)
-        # Score is the ratio of incomplete tasks
-        checklist.score = incomplete_regrets / total_regrets
-        logger.info(f"Updated checklist {checklist.id} score to {checklist.score} ({incomplete_regrets}/{total_regrets} incomplete)")
-        checklist.save()
+def update_checklist_score(sender, instance, created, **kwargs) -> None:
+    logger.debug(f"Signal triggered for Regret {instance.id}")
+
+    if created:
+        total_delta = 1
+        incomplete_delta = 0 if instance.success else 1
+    elif not hasattr(instance, '_loaded_success'):
+        # Instance was not loaded from the database, so the previous state is unknown
+        logger.info(f"Recounting regrets for checklist {instance.checklist_id}")
+        Checklist.refresh_regret_counts(instance.checklist_id)
+        instance._loaded_success = instance.success
+        checklist_score_changed.send(
+            sender=Checklist,
+            checklist_id=instance.checklist_id,
+            user_id=instance.checklist.user_id,
+            local_date=instance.checklist.local_date,
+        )
+        return
+    elif instance._loaded_success == instance.success:
+        # Nothing that affects the score has changed, but the regret list has
+        Checklist.touch(instance.checklist_id)
+        return
     else:
-        logger.info(f"No regrets found for checklist {checklist.id}")
+        total_delta = 0
+        incomplete_delta = -1 if instance.success else 1
+
+    instance._loaded_success = instance.success
+
+    # Running totals are adjusted in one UPDATE, independent of the number of regrets
+    Checklist.adjust_regret_counts(instance.checklist_id, total_delta, incomplete_delta)
+    logger.debug(f"Adjusted checklist {instance.checklist_id} regret counts by ({total_delta}, {incomplete_delta})")
+    checklist_score_changed.send(
+        sender=Checklist,
+        checklist_id=instance.checklist_id,
+        user_id=instance.checklist.user_id,
+        local_date=instance.checklist.local_date,
+    )
+
+
+@receiver(post_delete, sender=Regret)
+def remove_regret_from_score(sender, instance, **kwargs) -> None:
+    incomplete_delta = 0 if getattr(instance, '_loaded_success', instance.success) else -1
+    if not Checklist.adjust_regret_counts(instance.checklist_id, -1, incomplete_delta):
+        # The checklist itself is being deleted
+        return
+    user_id, local_date = Checklist.objects.filter(pk=instance.checklist_id).values_list('user_id', 'local_date').get()
+    checklist_score_changed.send(
+        sender=Checklist,
+        checklist_id=instance.checklist_id,
+        user_id=user_id,
+        local_date=local_date,
+    )
+
+
+@receiver(checklist_score_changed)
+def invalidate_network_lists_on_score_change(sender, user_id, **kwargs) -> None:
+    invalidate_lists_containing([user_id])
+
+
+@receiver(post_save, sender=Checklist)
+def invalidate_network_lists_on_new_checklist(sender, instance, created, **kwargs) -> None:
+    # A new checklist becomes the user's latest one shown in network lists
+    if created:
+        invalidate_lists_containing([instance.user_id])
+
+
+@receiver(post_save, sender=Checklist)
+def touch_user_checklists_on_checklist_save(sender, instance, **kwargs) -> None:
+    # Regret writes advance the version in Checklist.adjust_regret_counts
+    User.touch_checklists([instance.user_id])
+
+
+@receiver(post_save, sender=Checklist)
+def refresh_score_rollups_on_checklist_save(sender, instance, **kwargs) -> None:
+    # Regret writes apply their deltas in Checklist.adjust_regret_counts; a saved
+    # checklist (new, or edited directly) is recomputed once the save commits
+    user_id, local_date = instance.user_id, instance.local_date
+    transaction.on_commit(lambda: ScoreRollup.refresh([user_id], [local_date]))
+
+
+@receiver(post_delete, sender=Checklist)
+def refresh_score_rollups_on_checklist_delete(sender, instance, origin=None, **kwargs) -> None:
+    # The checklist's regret deltas are applied as they are deleted with it, but
+    # it still counts in its periods; a deleted user's rollups go with the user
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    user_id, local_date = instance.user_id, instance.local_date
+    transaction.on_commit(lambda: ScoreRollup.refresh([user_id], [local_date]))
+
+
+@receiver(checklist_score_changed)
+def update_leaderboard_on_score_change(sender, user_id, **kwargs) -> None:
+    # One UPDATE over every follower's edge, so it runs off the request
+    run_after_commit(Network.update_following_score, user_id)
+
+
+@receiver(post_save, sender=Checklist)
+def update_leaderboard_on_new_checklist(sender, instance, created, **kwargs) -> None:
+    # A new checklist becomes the user's latest one on their followers' leaderboards
+    if created:
+        run_after_commit(Network.update_following_score, instance.user_id)
+
+
+def publish_latest_score(user_id) -> None:
+    """Send a user's latest checklist score to clients streaming their followers' events"""
+    topic = score_topic(user_id)
+    broker = get_broker()
+    if not broker.has_subscribers(topic):
+        return
+
+    def publish():
+        latest = Checklist.objects.filter(user_id=user_id).order_by('-created_at').values_list('score', 'created_at').first()
+        if latest is not None:
+            score, created_at = latest
+            broker.publish(topic, {
+                'user_id': user_id,
+                'regret_index': float(score),
+                'checklist_created_at': created_at.astimezone(pytz.UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            })
+
+    # Subscribers must not see a score that is rolled back
+    transaction.on_commit(publish)
+
+
+@receiver(checklist_score_changed)
+def publish_score_change(sender, user_id, **kwargs) -> None:
+    publish_latest_score(user_id)
+
+
+@receiver(post_save, sender=Checklist)
+def publish_new_checklist(sender, instance, created, **kwargs) -> None:
+    if created:
+        publish_latest_score(instance.user_id)
+
+
+@receiver(post_save, sender=Network)
+@receiver(post_delete, sender=Network)
+def invalidate_network_lists_on_follow_change(sender, instance, created=True, **kwargs) -> None:
+    if not created:
+        return
+    invalidate_network_lists([
+        (instance.follower_id, 'following'),
+        (instance.following_id, 'followers'),
+    ])
+    # Both users' follower/following counts changed wherever they are listed
+    invalidate_lists_containing([instance.follower_id, instance.following_id])
+
+
+def record_follow_changes(follower_id, following_ids, follows):
+    """Update the follow graph once the edges are committed, so no worker sees a rolled-back change"""
+    def record():
+        for following_id in following_ids:
+            follow_graph.record(follower_id, following_id, follows=follows)
+        bump_version()
+
+    transaction.on_commit(record)
+
+
+@receiver(post_save, sender=Network)
+def update_follow_graph_on_follow(sender, instance, created, **kwargs) -> None:
+    if created:
+        record_follow_changes(instance.follower_id, [instance.following_id], follows=True)
+
+
+@receiver(post_delete, sender=Network)
+def update_follow_graph_on_unfollow(sender, instance, **kwargs) -> None:
+    record_follow_changes(instance.follower_id, [instance.following_id], follows=False)
+
+
+@receiver(follows_created)
+def update_follow_graph_on_bulk_follow(sender, follower_id, following_ids, **kwargs) -> None:
+    record_follow_changes(follower_id, list(following_ids), follows=True)
+
+
+@receiver(follows_created)
+def invalidate_network_lists_on_bulk_follow(sender, follower_id, following_ids, **kwargs) -> None:
+    invalidate_network_lists(
+        [(follower_id, 'following')] + [(following_id, 'followers') for following_id in following_ids]
+    )
+    invalidate_lists_containing([follower_id, *following_ids])
+
+
+@receiver(post_save, sender=User)
+def invalidate_network_lists_on_user_change(sender, instance, created, update_fields=None, **kwargs) -> None:
+    if created:
+        return
+    if update_fields is not None and not NETWORK_LIST_USER_FIELDS.intersection(update_fields):
+        return
+    invalidate_lists_containing([instance.id])
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_on_change(sender, instance, created, update_fields=None, **kwargs) -> None:
+    if created:
+        return
+    if update_fields is not None and not AUTH_USER_FIELDS.intersection(update_fields):
+        return
+    invalidate_cached_user(instance.id)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_cached_user_on_delete(sender, instance, **kwargs) -> None:
+    invalidate_cached_user(instance.id)
@@ -0,0 +1,230 @@
+from datetime import date
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Checklist, Network, Regret, ScoreRollup, User
+from .signals import checklist_score_changed
+
+ROLLUP_FIELDS = ('period', 'period_start', 'score', 'score_sum', 'checklists', 'total_regrets', 'incomplete_regrets')
+
+
+class RegretCountTests(TestCase):
+    """Checklist counts, scores and rollups kept by Checklist.adjust_regret_counts and the regret signals"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('counts')
+        # Two checklists in the same week and month, so deltas must leave the other one's share intact
+        self.checklist = Checklist.objects.create(user=self.user, local_date=date(2026, 10, 14))
+        self.other = Checklist.objects.create(user=self.user, local_date=date(2026, 10, 12), score=Decimal('0.2500'))
+        # Rollups are built after commit, which test transactions never reach
+        ScoreRollup.refresh([self.user.id], [self.checklist.local_date, self.other.local_date])
+        self.changes = []
+        checklist_score_changed.connect(self.record_change)
+
+    def tearDown(self):
+        checklist_score_changed.disconnect(self.record_change)
+
+    def record_change(self, sender, checklist_id, user_id, local_date=None, **kwargs):
+        self.changes.append((checklist_id, user_id, local_date))
+
+    def assertCounts(self, total, incomplete, score):
+        checklist = Checklist.objects.get(pk=self.checklist.pk)
+        self.assertEqual((checklist.total_regrets, checklist.incomplete_regrets), (total, incomplete))
+        self.assertEqual(checklist.score, Decimal(score))
+
+    def assertRollupsCurrent(self):
+        """The rollups kept by deltas equal a full recompute"""
+        rollups = ScoreRollup.objects.filter(user=self.user).order_by('period', 'period_start')
+        kept = list(rollups.values_list(*ROLLUP_FIELDS))
+        ScoreRollup.refresh([self.user.id], [self.checklist.local_date])
+        self.assertEqual(kept, list(rollups.values_list(*ROLLUP_FIELDS)))
+
+    def version(self):
+        return Checklist.objects.values_list('version', flat=True).get(pk=self.checklist.pk)
+
+    def test_create(self):
+        Regret.objects.create(checklist=self.checklist, description="late night", success=False)
+        self.assertCounts(1, 1, '1.0000')
+        Regret.objects.create(checklist=self.checklist, description="skipped gym", success=True)
+        Regret.objects.create(checklist=self.checklist, description="called home", success=True)
+        self.assertCounts(3, 1, '0.3333')
+        self.assertRollupsCurrent()
+        self.assertEqual(self.changes, [(self.checklist.pk, self.user.id, self.checklist.local_date)] * 3)
+
+    def test_flip(self):
+        regret = Regret.objects.create(checklist=self.checklist, description="late night", success=False)
+        Regret.objects.create(checklist=self.checklist, description="skipped gym", success=False)
+        regret = Regret.objects.get(pk=regret.pk)
+        regret.success = True
+        regret.save()
+        self.assertCounts(2, 1, '0.5000')
+        regret.success = False
+        regret.save()
+        self.assertCounts(2, 2, '1.0000')
+        self.assertRollupsCurrent()
+        self.assertEqual(len(self.changes), 4)
+
+    def test_unchanged_save_only_advances_version(self):
+        regret = Regret.objects.create(checklist=self.checklist, description="late night", success=False)
+        regret = Regret.objects.get(pk=regret.pk)
+        version = self.version()
+        self.changes.clear()
+        regret.description = "very late night"
+        regret.save()
+        self.assertCounts(1, 1, '1.0000')
+        self.assertEqual(self.version(), version + 1)
+        self.assertEqual(self.changes, [])
+        self.assertRollupsCurrent()
+
+    def test_save_of_unloaded_regret_recounts(self):
+        regret = Regret.objects.create(checklist=self.checklist, description="late night", success=False)
+        Regret.objects.create(checklist=self.checklist, description="skipped gym", success=False)
+        # A queryset update bypasses the signals and leaves the counts behind
+        Regret.objects.filter(checklist=self.checklist).update(success=True)
+        self.assertCounts(2, 2, '1.0000')
+        Regret(pk=regret.pk, checklist=self.checklist, description="late night", success=True).save()
+        self.assertCounts(2, 0, '0.0000')
+        self.assertRollupsCurrent()
+        self.assertEqual(self.changes[-1], (self.checklist.pk, self.user.id, self.checklist.local_date))
+
+    def test_delete(self):
+        regret = Regret.objects.create(checklist=self.checklist, description="late night", success=False)
+        Regret.objects.create(checklist=self.checklist, description="skipped gym", success=True)
+        self.changes.clear()
+        regret.delete()
+        self.assertCounts(1, 0, '0.0000')
+        self.assertRollupsCurrent()
+        self.assertEqual(self.changes, [(self.checklist.pk, self.user.id, self.checklist.local_date)])
+
+    def test_delete_last_regret_keeps_score(self):
+        regret = Regret.objects.create(checklist=self.checklist, description="late night", success=True)
+        regret.delete()
+        self.assertCounts(0, 0, '0.0000')
+        self.assertRollupsCurrent()
+
+    def test_completed_checklist_keeps_score(self):
+        Checklist.objects.filter(pk=self.checklist.pk).update(completed=True, score=Decimal('0.7500'))
+        ScoreRollup.refresh([self.user.id], [self.checklist.local_date])
+        Regret.objects.create(checklist=self.checklist, description="late night", success=False)
+        self.assertCounts(1, 1, '0.7500')
+        self.assertRollupsCurrent()
+
+    def test_delete_checklist(self):
+        Regret.objects.create(checklist=self.checklist, description="late night", success=False)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.checklist.delete()
+        self.assertFalse(Regret.objects.filter(checklist_id=self.checklist.pk).exists())
+        for callback in callbacks:
+            if callback.__qualname__.startswith('refresh_score_rollups'):
+                callback()
+        week = ScoreRollup.objects.get(user=self.user, period=ScoreRollup.WEEK)
+        self.assertEqual((week.checklists, week.score, week.total_regrets), (1, Decimal('0.2500'), 0))
+        self.assertFalse(ScoreRollup.objects.filter(user=self.user, period=ScoreRollup.DAY, period_start=self.checklist.local_date).exists())
+
+    def test_adjust_missing_checklist(self):
+        self.assertEqual(Checklist.adjust_regret_counts(0, 1, 1), 0)
+
+
+class LeaderboardPaginationTests(TestCase):
+    """KeysetCursorPagination through the leaderboard, where many followed users share a score"""
+
+    scores = ['0.5000', '0.5000', '0.2000', '0.5000', '0.9000', '0.5000', '0.2000']
+
+    def setUp(self):
+        self.user = User.objects.create_user('leader')
+        for i, score in enumerate(self.scores):
+            followed = User.objects.create_user(f'followed{i}')
+            Network.objects.create(follower=self.user, following=followed)
+            Network.objects.filter(follower=self.user, following=followed).update(
+                following_score=Decimal(score), following_checklist_at=timezone.now(),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ranked(self, descending):
+        edges = Network.objects.filter(follower=self.user).values_list('following_score', 'id', 'following_id')
+        return [following_id for _, _, following_id in sorted(edges, reverse=descending)]
+
+    def walk(self, url, link):
+        """Follow the link of each page from url; returns the pages and the last response"""
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append([user['id'] for user in data['users']])
+            url = data[link]
+        return pages, data
+
+    def assertPagesThrough(self, order):
+        pages, last = self.walk(f'/api/network/leaderboard/?order={order}&page_size=2', 'next')
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual(sum(pages, []), self.ranked(descending=order == 'desc'))
+        # Walking back from the last page yields the same pages in reverse
+        back, first = self.walk(last['previous'], 'previous')
+        self.assertEqual(back, pages[-2::-1])
+        self.assertIsNone(first['previous'])
+        self.assertIsNotNone(first['next'])
+
+    def test_ascending(self):
+        self.assertPagesThrough('asc')
+
+    def test_descending(self):
+        self.assertPagesThrough('desc')
+
+    def test_single_page(self):
+        data = self.client.get('/api/network/leaderboard/').json()
+        self.assertEqual([user['id'] for user in data['users']], self.ranked(descending=False))
+        self.assertIsNone(data['next'])
+        self.assertIsNone(data['previous'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/network/leaderboard/?cursor=bogus').status_code, 404)
+
+
+class LoginOrRegisterTests(TestCase):
+    """User.objects.login_or_register on whichever database the tests run against"""
+
+    def test_creates_then_finds(self):
+        user, created = User.objects.login_or_register('newcomer', allow_networking=False)
+        self.assertTrue(created)
+        self.assertFalse(user.allow_networking)
+        self.assertTrue(user.is_active)
+        self.assertFalse(user.has_usable_password())
+
+        again, created = User.objects.login_or_register('newcomer', allow_networking=True)
+        self.assertFalse(created)
+        self.assertEqual(again.pk, user.pk)
+        # Defaults only apply when the user is created
+        self.assertFalse(again.allow_networking)
+        self.assertEqual(User.objects.filter(username='newcomer').count(), 1)
+
+    def test_existing_user_keeps_password(self):
+        existing = User.objects.create_user('regular', password='secret')
+        user, created = User.objects.login_or_register('regular')
+        self.assertFalse(created)
+        self.assertEqual(user.pk, existing.pk)
+        self.assertTrue(user.check_password('secret'))
+
+    def test_endpoint(self):
+        client = APIClient()
+        response = client.post('/auth/user/', {'username': 'via-api'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = client.post('/auth/user/', {'username': 'via-api'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    @skipUnless(connection.vendor == 'postgresql', "INSERT ... ON CONFLICT path is PostgreSQL only")
+    def test_postgresql_single_statement(self):
+        with self.assertNumQueries(1):
+            user, created = User.objects.login_or_register('single')
+        self.assertTrue(created)
+        # Every field is read back from the RETURNING row
+        self.assertEqual(User.objects.get(pk=user.pk).date_joined, user.date_joined)
+        self.assertEqual(user.get_deferred_fields(), set())
+        with self.assertNumQueries(1):
+            found, created = User.objects.login_or_register('single')
+        self.assertFalse(created)
+        self.assertEqual(found.pk, user.pk)
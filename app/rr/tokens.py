@@ -0,0 +1,113 @@
+"""
+Refresh tokens with a bounded blacklist.
+
+Rotation blacklists every refreshed token, and refresh tokens live for ~100
+years, so the token_blacklist tables would otherwise grow forever. Instead:
+
+* prune_token_blacklist deletes blacklisted tokens once they are older than
+  REFRESH_TOKEN_RETENTION, in chunks.
+* A token issued before that window must still have its OutstandingToken row.
+  A pruned token is therefore still rejected after its rows are gone.
+* Blacklisting is permanent, so jtis known to be blacklisted are remembered in
+  a bounded per-process LRU. Replays of rotated tokens are then rejected
+  without a query.
+"""
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+class JtiLRU:
+    """Thread-safe, size-bounded set of token ids with least-recently-used eviction"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._jtis = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti):
+        with self._lock:
+            if jti not in self._jtis:
+                return False
+            self._jtis.move_to_end(jti)
+            return True
+
+    def __len__(self):
+        return len(self._jtis)
+
+    def add(self, jti):
+        with self._lock:
+            self._jtis[jti] = None
+            self._jtis.move_to_end(jti)
+            while len(self._jtis) > self.max_size:
+                self._jtis.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._jtis.clear()
+
+
+blacklisted_jtis = JtiLRU(getattr(settings, 'BLACKLISTED_JTI_CACHE_SIZE', 10000))
+
+
+def retention_cutoff():
+    """Blacklisted tokens issued before this moment may have been pruned"""
+    return timezone.now() - getattr(settings, 'REFRESH_TOKEN_RETENTION', timedelta(days=30))
+
+
+class RetainedRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check survives pruning and skips the user lookups"""
+
+    _outstanding_id = None
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if jti in blacklisted_jtis:
+            raise TokenError(_("Token is blacklisted"))
+
+        # One query answers both "is it known" and "is it blacklisted"
+        row = (
+            OutstandingToken.objects.filter(jti=jti)
+            .values_list('id', 'blacklistedtoken__id')
+            .first()
+        )
+        if row is None:
+            issued_at = self.payload.get('iat')
+            if issued_at is None or datetime_from_epoch(issued_at) < retention_cutoff():
+                raise TokenError(_("Token is blacklisted"))
+            return
+
+        self._outstanding_id, blacklisted_id = row
+        if blacklisted_id is not None:
+            blacklisted_jtis.add(jti)
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        outstanding_id = self._outstanding_id or self.outstand()[0].id
+        # A concurrent refresh of the same token may have blacklisted it already
+        entry = BlacklistedToken(token_id=outstanding_id)
+        BlacklistedToken.objects.bulk_create([entry], ignore_conflicts=True)
+        blacklisted_jtis.add(self.payload[api_settings.JTI_CLAIM])
+        return entry
+
+    def outstand(self):
+        self._outstanding_id = None
+        token, created = OutstandingToken.objects.get_or_create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            defaults={
+                'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+                'created_at': self.current_time,
+                'token': str(self),
+                'expires_at': datetime_from_epoch(self.payload['exp']),
+            },
+        )
+        return token, created
@@ -21,6 +21,7 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 from .views import *
+from .async_views import AsyncNetworkValidationView, AsyncNetworkFollowView, AsyncNetworkListView, AsyncNetworkEventsView
 
 
 # Admin panel
@@ -37,19 +38,38 @@ urlpatterns += [
 # API
 urlpatterns += [
     path("api/checklists/", ChecklistListCreateView.as_view(), name="checklists"),
+    path("api/checklists/history/", ScoreHistoryView.as_view(), name="checklist_history"),
     path("api/checklists/<int:pk>/regrets/", RegretListCreateView.as_view(), name="regrets"),
+    path("api/checklists/<int:pk>/regrets/batch/", RegretBulkCreateView.as_view(), name="regrets_batch"),
     path("api/checklists/<int:pk>/regrets/<int:id>/", RegretRetrieveUpdateView.as_view(), name="update_regrets"),
 ]
 
 # Network API
 urlpatterns += [
     path("api/network/validate/<str:username>/", NetworkValidationView.as_view(), name="network_validate"),
+    path("api/network/search/", NetworkSearchView.as_view(), name="network_search"),
     path("api/network/follow/<str:username>/", NetworkFollowView.as_view(), name="network_follow"),
+    path("api/network/follow-batch/", NetworkBatchFollowView.as_view(), name="network_follow_batch"),
     path("api/network/unfollow/<str:username>/", NetworkUnfollowView.as_view(), name="network_unfollow"),
     path("api/network/list/<str:list_type>/", NetworkListView.as_view(), name="network_list"),
+    path("api/network/leaderboard/", NetworkLeaderboardView.as_view(), name="network_leaderboard"),
+    path("api/network/suggestions/", NetworkSuggestionsView.as_view(), name="network_suggestions"),
     path("api/network/settings/", NetworkSettingsView.as_view(), name="network_settings"),
 ]
 
+# Async Network API (served concurrently under ASGI)
+urlpatterns += [
+    path("api/async/network/validate/<str:username>/", AsyncNetworkValidationView.as_view(), name="async_network_validate"),
+    path("api/async/network/follow/<str:username>/", AsyncNetworkFollowView.as_view(), name="async_network_follow"),
+    path("api/async/network/list/<str:list_type>/", AsyncNetworkListView.as_view(), name="async_network_list"),
+    path("api/async/network/events/", AsyncNetworkEventsView.as_view(), name="async_network_events"),
+]
+
+# Operations
+urlpatterns += [
+    path("api/admin/metrics/", RuntimeMetricsView.as_view(), name="runtime_metrics"),
+]
+
 
 # Swagger
 urlpatterns += [
@@ -1,21 +1,33 @@
 from rest_framework.generics import RetrieveAPIView, CreateAPIView, ListCreateAPIView, ListAPIView, RetrieveUpdateAPIView, RetrieveUpdateDestroyAPIView, DestroyAPIView
-from rest_framework.exceptions import ValidationError
 from django_filters import rest_framework as filters
 import logging
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import pytz
 
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db import transaction
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 
-from .models import User, Checklist, Regret, Network
+from .models import User, Checklist, Regret, Network, ScoreRollup
 from .serializers import *
+# Imported after the star imports so DRF's ValidationError (a 400) is not
+# shadowed by Django's ValidationError re-exported from .models
+from rest_framework.exceptions import NotFound, ValidationError
 from .filters import ChecklistFilter
+from .pagination import ChecklistCursorPagination, LeaderboardCursorPagination, NetworkCursorPagination
+from .caching import get_network_list, network_list_key, set_network_list
+from .conditional import checklists_etag, network_list_etag, regrets_etag
+from .graph import follow_graph
+from .metrics import runtime_metrics
+from .search import search_usernames
+from .signals import checklist_score_changed, follows_created
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Greatest
 
 # Date Format Requirements for checklist_created_at:
 # Format: ISO 8601 with UTC timezone
@@ -27,26 +39,55 @@ from django.db import IntegrityError
 
 logger = logging.getLogger(__name__)
 
+
+def utc_timestamp(value):
+    """Format a datetime for checklist_created_at, e.g. "2025-08-17T18:00:00Z\""""
+    return value.astimezone(pytz.UTC).isoformat(timespec='seconds')[:19] + 'Z'
+
+
 class UserCreateView(CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = []  # Allow anyone to register
 
     def perform_create(self, serializer):
-        print("About to create user")
         user = serializer.save()
-        print(f"User created with is_active = {user.is_active}")
+        logger.debug(f"User created with is_active = {user.is_active}")
         return user
 
 
 class ChecklistListCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(condition(etag_func=checklists_etag))
     def get(self, request):
-        """Get user's checklists with filtering"""
-        checklists = Checklist.objects.filter(user=request.user)
-        serializer = ChecklistSerializer(checklists, many=True)
-        return Response(serializer.data)
+        """Get user's checklists with filtering, one cursor page at a time.
+
+        ChecklistFilter parameters narrow the rows in SQL, and ?fields= (a
+        comma-separated subset of the checklist fields) limits the columns.
+        """
+        fields = self.get_fields(request)
+        filterset = ChecklistFilter(request.query_params, queryset=Checklist.objects.filter(user=request.user), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        # The cursor is built from created_at and id, so they are read even when not sent
+        columns = [field for field in CHECKLIST_ROW_FIELDS if field in fields or field in ('id', 'created_at')]
+        paginator = ChecklistCursorPagination()
+        page = paginator.paginate_queryset(filterset.qs.values(*columns), request, view=self)
+        if len(columns) != len(fields):
+            page = [{field: row[field] for field in fields} for row in page]
+        return paginator.get_paginated_response(page)
+
+    def get_fields(self, request):
+        """Checklist fields selected by ?fields=, in the serializer's order"""
+        if 'fields' not in request.query_params:
+            return CHECKLIST_ROW_FIELDS
+        requested = {field.strip() for field in request.query_params['fields'].split(',') if field.strip()}
+        unknown = requested.difference(CHECKLIST_ROW_FIELDS)
+        if unknown or not requested:
+            raise ValidationError({"fields": [f"Choose from: {', '.join(CHECKLIST_ROW_FIELDS)}"]})
+        return tuple(field for field in CHECKLIST_ROW_FIELDS if field in requested)
 
     def post(self, request):
         """Create or get checklist for the specified local datetime"""
@@ -69,58 +110,78 @@ class ChecklistListCreateView(APIView):
         utc_datetime = local_datetime.astimezone(pytz.UTC)
         local_date = local_datetime.date()
         
-        print(f"DEBUG: Checklist request - User: {user.username}, Request local: {local_datetime}, Request local date: {local_date}")
+        logger.debug(f"Checklist request - User: {user.id}, Request local: {local_datetime}, Request local date: {local_date}")
         
-        # Get user's timezone from the local_datetime
-        user_timezone = local_datetime.tzinfo
+        # Offset in minutes, kept alongside the local date for reference
+        utc_offset = int(local_datetime.utcoffset().total_seconds() // 60)
         
-        # Check if checklist exists for this local date by converting stored UTC times to user's timezone
-        user_checklists = Checklist.objects.filter(user=user)
-        existing_checklist = None
+        # Single indexed lookup on (user, local_date); the unique constraint
+        # makes a concurrent create fall back to fetching the winner's row
+        checklist, created = Checklist.objects.get_or_create(
+            user=user,
+            local_date=local_date,
+            defaults={
+                'created_at': utc_datetime,
+                'utc_offset': utc_offset,
+            }
+        )
         
-        for checklist in user_checklists:
-            # Convert checklist's UTC created_at to user's timezone
-            checklist_local_date = checklist.created_at.astimezone(user_timezone).date()
-            if checklist_local_date == local_date:
-                existing_checklist = checklist
-                print(f"DEBUG: Found checklist {checklist.id} - DB UTC: {checklist.created_at}, DB local: {checklist.created_at.astimezone(user_timezone)}")
-                break
-        
-        if existing_checklist:
-            # Return existing checklist
-            serializer = ChecklistSerializer(existing_checklist)
-            return Response(serializer.data)
-        
-        else:
-            print(f"DEBUG: No checklist found for {local_date}, creating new one...")
-            # Create new checklist
-            with transaction.atomic():
-                # Double-check after acquiring lock
-                user_checklists = Checklist.objects.filter(user=user)
-                existing_checklist = None
-                
-                for checklist in user_checklists:
-                    checklist_local_date = checklist.created_at.astimezone(user_timezone).date()
-                    if checklist_local_date == local_date:
-                        existing_checklist = checklist
-                        break
-                
-                if not existing_checklist:
-                    try:
-                        checklist = Checklist.objects.create(
-                            user=user,
-                            created_at=utc_datetime
-                        )
-                        print(f"DEBUG: Successfully created checklist: {checklist.id}")
-                    except Exception as e:
-                        print(f"DEBUG: Error creating checklist: {e}")
-                        raise
-                else:
-                    print(f"DEBUG: Checklist was created by another process: {existing_checklist.id}")
-                    checklist = existing_checklist
-            
-            serializer = ChecklistSerializer(checklist)
+        serializer = ChecklistSerializer(checklist)
+        if created:
+            logger.debug(f"Successfully created checklist: {checklist.id}")
             return Response(serializer.data, status=201)
+        
+        logger.debug(f"Found checklist {checklist.id} - DB UTC: {checklist.created_at}, local date: {checklist.local_date}")
+        return Response(serializer.data)
+
+
+class ScoreHistoryView(APIView):
+    """Score history of the user as parallel arrays, read from the precomputed rollups"""
+    permission_classes = [IsAuthenticated]
+    default_days = 365
+    max_points = 1000
+
+    def get(self, request):
+        """Get rollups for ?period=day|week|month between ?start= and ?end= (inclusive, YYYY-MM-DD)"""
+        period = request.query_params.get('period', ScoreRollup.DAY)
+        if period not in dict(ScoreRollup.PERIOD_CHOICES):
+            raise ValidationError("period must be one of: day, week, month")
+        try:
+            end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else timezone.now().date()
+            start = (
+                date.fromisoformat(request.query_params['start']) if 'start' in request.query_params
+                else end - timedelta(days=self.default_days - 1)
+            )
+        except ValueError:
+            raise ValidationError("start and end must be dates in YYYY-MM-DD format")
+        if start > end:
+            raise ValidationError("start must not be after end")
+
+        rows = (
+            ScoreRollup.objects
+            .filter(
+                user=request.user,
+                period=period,
+                period_start__gte=ScoreRollup.period_start_for(period, start),
+                period_start__lte=end,
+            )
+            # The newest points are kept when the range holds more than max_points
+            .order_by('-period_start')
+            .values_list('period_start', 'score', 'checklists', 'total_regrets', 'incomplete_regrets')[:self.max_points]
+        )
+        rows = list(rows)[::-1]
+        dates, scores, checklists, total_regrets, incomplete_regrets = (list(column) for column in zip(*rows)) if rows else ([], [], [], [], [])
+
+        return Response({
+            "period": period,
+            "start": start,
+            "end": end,
+            "dates": dates,
+            "scores": [float(score) for score in scores],
+            "checklists": checklists,
+            "total_regrets": total_regrets,
+            "incomplete_regrets": incomplete_regrets,
+        })
 
 
 class RegretListCreateView(ListCreateAPIView):
@@ -130,31 +191,64 @@ class RegretListCreateView(ListCreateAPIView):
     def get_queryset(self):
         return Regret.objects.filter(checklist__user=self.request.user, checklist__id=self.kwargs["pk"])
     
+    @method_decorator(condition(etag_func=regrets_etag))
     def get(self, request, *args, **kwargs):
         """Get regrets for a specific checklist"""
-        checklist_id = self.kwargs["pk"]
-        user = request.user
-        regrets = self.get_queryset()
-        
-        serializer = self.get_serializer(regrets, many=True)
-        return Response(serializer.data)
+        regrets = self.get_queryset().values(*REGRET_ROW_FIELDS)
+        return Response(list(regrets))
     
     def post(self, request, *args, **kwargs):
         """Create a new regret"""
         checklist_id = self.kwargs["pk"]
         user = request.user
-        print(f"DEBUG: Regret create request - User: {user.username}, Checklist ID: {checklist_id}")
+        logger.debug(f"Regret create request - User: {user.id}, Checklist ID: {checklist_id}")
         
         return super().post(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         checklist = get_object_or_404(Checklist, pk=self.kwargs["pk"], user=self.request.user)
         regret = serializer.save(checklist=checklist)
-        print(f"DEBUG: Created regret {regret.id} for checklist {checklist.id} - DB UTC: {checklist.created_at}")
+        logger.debug(f"Created regret {regret.id} for checklist {checklist.id} - DB UTC: {checklist.created_at}")
         
         return regret
 
 
+class RegretBulkCreateView(APIView):
+    """Create several regrets for a checklist in one request"""
+    permission_classes = [IsAuthenticated]
+    max_batch_size = 100
+
+    def post(self, request, pk):
+        """Create a batch of regrets and rescore the checklist once"""
+        checklist = get_object_or_404(Checklist, pk=pk, user=request.user)
+        
+        # Accept either a bare JSON list or {"regrets": [...]}
+        regrets_data = request.data.get('regrets') if isinstance(request.data, dict) else request.data
+        if not isinstance(regrets_data, list) or not regrets_data:
+            raise ValidationError("regrets must be a non-empty list")
+        if len(regrets_data) > self.max_batch_size:
+            raise ValidationError(f"At most {self.max_batch_size} regrets can be created at once")
+        
+        serializer = RegretSerializer(data=regrets_data, many=True)
+        serializer.is_valid(raise_exception=True)
+        
+        new_regrets = []
+        for regret_data in serializer.validated_data:
+            regret_data.pop('checklist', None)
+            new_regrets.append(Regret(checklist=checklist, **regret_data))
+        
+        # bulk_create skips post_save, so the score is adjusted here exactly once
+        with transaction.atomic():
+            regrets = Regret.objects.bulk_create(new_regrets)
+            incomplete = sum(1 for regret in regrets if not regret.success)
+            Checklist.adjust_regret_counts(checklist.id, len(regrets), incomplete)
+        checklist_score_changed.send(
+            sender=Checklist, checklist_id=checklist.id, user_id=checklist.user_id, local_date=checklist.local_date,
+        )
+        
+        return Response(RegretSerializer(regrets, many=True).data, status=201)
+
+
 class RegretRetrieveUpdateView(RetrieveUpdateAPIView):
     serializer_class = RegretSerializer
     permission_classes = [IsAuthenticated]
@@ -167,7 +261,7 @@ class RegretRetrieveUpdateView(RetrieveUpdateAPIView):
         # Only allow updates if it is the same local day the checklist was created
         regret = self.get_object()
         
-        print(f"DEBUG: Regret update request - User: {request.user.username}, Regret ID: {regret.id}, Checklist DB UTC: {regret.checklist.created_at}")
+        logger.debug(f"Regret update request - User: {request.user.id}, Regret ID: {regret.id}, Checklist ID: {regret.checklist_id}")
         
         # Only allow success field to be updated from false to true
         mutable_data = request.data.copy()
@@ -194,22 +288,15 @@ class UserLoginOrRegisterView(CreateAPIView):
     permission_classes = []  # Allow anyone to access
 
     def post(self, request, *args, **kwargs):
-        username = request.data.get('username')
-        if not username:
-            raise ValidationError("Username is required")
+        credentials = LoginOrRegisterSerializer(data=request.data)
+        credentials.is_valid(raise_exception=True)
+        defaults = dict(credentials.validated_data)
+        username = defaults.pop('username')
 
-        # Try to get existing user
-        try:
-            user = User.objects.get(username=username)
-            # User exists, return their tokens
-            serializer = self.get_serializer(user)
-            return Response(serializer.data)
-        except User.DoesNotExist:
-            # User doesn't exist, create new user
-            serializer = self.get_serializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
-            user = serializer.save()
-            return Response(serializer.data, status=201)
+        # Resolves an existing user or creates a new one in a single statement
+        user, created = User.objects.login_or_register(username, **defaults)
+        serializer = self.get_serializer(user)
+        return Response(serializer.data, status=201 if created else 200)
 
 
 class NetworkValidationView(APIView):
@@ -218,35 +305,42 @@ class NetworkValidationView(APIView):
     
     def get(self, request, username):
         """Check if username is valid for following"""
-        if not username:
-            return Response({"error": "Username is required"}, status=400)
-        
         try:
-            target_user = User.objects.get(username=username, is_active=True)
-            
-            # Check if user is trying to follow themselves
-            if target_user == request.user:
-                return Response({"error": "You cannot follow yourself"}, status=409)
-            
-            # Check if already following
-            if Network.objects.filter(follower=request.user, following=target_user).exists():
-                return Response({"error": "You are already following this user"}, status=409)
-            
-            # Check if target user allows networking
-            if not target_user.allow_networking:
-                return Response({"error": "This user has networking disabled"}, status=403)
-            
-            return Response({
-                "username": target_user.username,
-                "user_id": target_user.id,
-                "allow_networking": target_user.allow_networking
-            }, status=200)
-            
-        except User.DoesNotExist:
-            return Response({"error": "User not found"}, status=404)
+            body, status = network_validation_payload(request.user, username)
         except Exception as e:
             logger.error(f"Error validating username {username}: {e}")
-            return Response({"error": "Network operation failed"}, status=500)
+            body, status = {"error": "Network operation failed"}, 500
+        return Response(body, status=status)
+
+
+class NetworkSearchView(APIView):
+    """Find users to follow by username prefix"""
+    permission_classes = [IsAuthenticated]
+    min_query_length = 2
+    default_limit = 20
+    max_limit = 50
+
+    def get(self, request):
+        """Search ?q= among active users who allow networking, best matches first"""
+        query = request.query_params.get('q', '').strip()
+        if len(query) < self.min_query_length:
+            raise ValidationError(f"q must be at least {self.min_query_length} characters")
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError("limit must be an integer")
+        if not 1 <= limit <= self.max_limit:
+            raise ValidationError(f"limit must be between 1 and {self.max_limit}")
+
+        users = [
+            {
+                **user,
+                "following": follow_graph.follows(request.user.id, user["id"]),
+            }
+            for user in search_usernames(query)
+            if user["id"] != request.user.id
+        ][:limit]
+        return Response({"query": query, "count": len(users), "users": users})
 
 
 class NetworkFollowView(APIView):
@@ -255,40 +349,68 @@ class NetworkFollowView(APIView):
     
     def post(self, request, username):
         """Follow a user"""
-        if not username:
-            return Response({"error": "Username is required"}, status=400)
-        
         try:
-            target_user = User.objects.get(username=username, is_active=True)
-            
-            # Check if user is trying to follow themselves
-            if target_user == request.user:
-                return Response({"error": "You cannot follow yourself"}, status=409)
-            
-            # Check if already following
-            if Network.objects.filter(follower=request.user, following=target_user).exists():
-                return Response({"error": "You are already following this user"}, status=409)
-            
-            # Check if target user allows networking
-            if not target_user.allow_networking:
-                return Response({"error": "This user has networking disabled"}, status=403)
-            
-            # Create network relationship
-            network = Network.objects.create(follower=request.user, following=target_user)
-            
-            return Response({
-                "message": f"Successfully followed {target_user.username}",
-                "network_id": network.id,
-                "following": target_user.username
-            }, status=201)
-            
-        except User.DoesNotExist:
-            return Response({"error": "User not found"}, status=404)
-        except IntegrityError:
-            return Response({"error": "You are already following this user"}, status=409)
+            body, status = network_follow_payload(request.user, username)
         except Exception as e:
             logger.error(f"Error following user {username}: {e}")
-            return Response({"error": "Network operation failed"}, status=500)
+            body, status = {"error": "Network operation failed"}, 500
+        return Response(body, status=status)
+
+
+class NetworkBatchFollowView(APIView):
+    """Follow several users at once (e.g. when importing contacts)"""
+    permission_classes = [IsAuthenticated]
+    max_batch_size = 500
+
+    def post(self, request):
+        """Follow a list of usernames and report the outcome for each"""
+        # Accept either a bare JSON list or {"usernames": [...]}
+        usernames = request.data.get('usernames') if isinstance(request.data, dict) else request.data
+        if not isinstance(usernames, list) or not usernames:
+            raise ValidationError("usernames must be a non-empty list")
+        if not all(isinstance(username, str) for username in usernames):
+            raise ValidationError("usernames must be strings")
+        usernames = list(dict.fromkeys(usernames))
+        if len(usernames) > self.max_batch_size:
+            raise ValidationError(f"At most {self.max_batch_size} users can be followed at once")
+
+        targets = {
+            target.username: target
+            for target in User.objects.filter(username__in=usernames, is_active=True).only('id', 'username', 'allow_networking')
+        }
+        already_following = set(
+            Network.objects.filter(follower=request.user, following_id__in=[target.id for target in targets.values()])
+            .values_list('following_id', flat=True)
+        )
+
+        results = {}
+        to_follow = []
+        for username in usernames:
+            target = targets.get(username)
+            if target is None:
+                results[username] = "not_found"
+            elif target.id == request.user.id:
+                results[username] = "self"
+            elif target.id in already_following:
+                results[username] = "already_following"
+            elif not target.allow_networking:
+                results[username] = "networking_disabled"
+            else:
+                to_follow.append(target)
+
+        with transaction.atomic():
+            followed_ids = set(Network.follow_many(request.user.id, [target.id for target in to_follow]))
+        for target in to_follow:
+            # A target missing from followed_ids was followed concurrently
+            results[target.username] = "followed" if target.id in followed_ids else "already_following"
+
+        if followed_ids:
+            follows_created.send(sender=Network, follower_id=request.user.id, following_ids=list(followed_ids))
+
+        return Response({
+            "followed": len(followed_ids),
+            "results": [{"username": username, "status": results[username]} for username in usernames],
+        }, status=200)
 
 
 class NetworkUnfollowView(APIView):
@@ -323,62 +445,233 @@ class NetworkUnfollowView(APIView):
             return Response({"error": "Network operation failed"}, status=500)
 
 
+def check_follow_target(user, username):
+    """Resolve the active user that ``user`` asks to follow by username.
+
+    Returns ``(target_user, None)`` when the follow is allowed, otherwise
+    ``(None, (body, status))`` with the error to respond with.
+    """
+    if not username:
+        return None, ({"error": "Username is required"}, 400)
+    try:
+        target_user = User.objects.get(username=username, is_active=True)
+    except User.DoesNotExist:
+        return None, ({"error": "User not found"}, 404)
+
+    # Check if user is trying to follow themselves
+    if target_user.id == user.id:
+        return None, ({"error": "You cannot follow yourself"}, 409)
+
+    # Check if already following
+    if Network.objects.filter(follower=user, following=target_user).exists():
+        return None, ({"error": "You are already following this user"}, 409)
+
+    # Check if target user allows networking
+    if not target_user.allow_networking:
+        return None, ({"error": "This user has networking disabled"}, 403)
+
+    return target_user, None
+
+
+def network_validation_payload(user, username):
+    """Body and status of the username validation. Shared by the sync and async validation views."""
+    target_user, error = check_follow_target(user, username)
+    if error:
+        return error
+    return {
+        "username": target_user.username,
+        "user_id": target_user.id,
+        "allow_networking": target_user.allow_networking
+    }, 200
+
+
+def network_follow_payload(user, username):
+    """Follow a user by username; returns the body and status. Shared by the sync and async follow views."""
+    target_user, error = check_follow_target(user, username)
+    if error:
+        return error
+    try:
+        # Create network relationship (Network.save keeps the counts in step)
+        network = Network.objects.create(follower=user, following=target_user)
+    except IntegrityError:
+        # Followed concurrently since the check
+        return {"error": "You are already following this user"}, 409
+    return {
+        "message": f"Successfully followed {target_user.username}",
+        "network_id": network.id,
+        "following": target_user.username
+    }, 201
+
+
+def network_list_payload(request, user, list_type):
+    """Build one page of the following/followers list of a user.
+
+    ``request`` must be a DRF Request, since the cursor paginator reads its query
+    parameters. Shared by the sync and async network list views.
+    """
+    if list_type == "following":
+        # Get users that the current user follows
+        networks = Network.objects.filter(follower=user)
+        user_field = 'following'
+    else:
+        # Get users that follow the current user
+        networks = Network.objects.filter(following=user)
+        user_field = 'follower'
+    
+    # Resolve each user's latest checklist (regardless of date) in the same query,
+    # using the (user, created_at) index; users without checklists are skipped.
+    # Rows are read as values, without building model instances.
+    latest_checklist = Checklist.objects.filter(user=OuterRef(user_field)).order_by('-created_at')
+    networks = networks.annotate(
+        latest_score=Subquery(latest_checklist.values('score')[:1]),
+        latest_created_at=Subquery(latest_checklist.values('created_at')[:1]),
+    ).filter(latest_created_at__isnull=False).values(
+        'id', 'created_at', 'latest_score', 'latest_created_at',
+        listed_id=F(user_field),
+        listed_username=F(f'{user_field}__username'),
+        listed_allow_networking=F(f'{user_field}__allow_networking'),
+        # Never report a negative denormalized count
+        listed_followers_count=Greatest(F(f'{user_field}__followers_count'), 0),
+        listed_following_count=Greatest(F(f'{user_field}__following_count'), 0),
+        listed_date_joined=F(f'{user_field}__date_joined'),
+    )
+    
+    paginator = NetworkCursorPagination()
+    page = paginator.paginate_queryset(networks, request)
+    
+    # Send actual score and UTC creation timestamp. Mutual when the follow also
+    # goes the other way, checked in the in-memory graph
+    following = list_type == "following"
+    user_data = [
+        {
+            "id": row['listed_id'],
+            "username": row['listed_username'],
+            "regret_index": float(row['latest_score']),
+            "checklist_created_at": utc_timestamp(row['latest_created_at']),
+            "allow_networking": row['listed_allow_networking'],
+            "followers_count": row['listed_followers_count'],
+            "following_count": row['listed_following_count'],
+            "date_joined": row['listed_date_joined'],
+            "mutual": (
+                follow_graph.follows(row['listed_id'], user.id) if following
+                else follow_graph.follows(user.id, row['listed_id'])
+            ),
+        }
+        for row in page
+    ]
+    
+    return {
+        "list_type": list_type,
+        "count": len(user_data),
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
+        "users": user_data
+    }
+
+
 class NetworkListView(APIView):
     """Get network users (Following/Followers list)"""
     permission_classes = [IsAuthenticated]
     
+    @method_decorator(condition(etag_func=network_list_etag))
     def get(self, request, list_type="following"):
         """Get following or followers list"""
         if list_type not in ["following", "followers"]:
             return Response({"error": "Invalid list type. Use 'following' or 'followers'"}, status=400)
         
+        # Pages are cached per user and list until a follow or score change invalidates them
+        page_url = request.build_absolute_uri()
+        cache_key = network_list_key(request.user.id, list_type, page_url)
+        cached_payload = get_network_list(cache_key)
+        if cached_payload is not None:
+            response = Response(cached_payload, status=200)
+            response['X-Cache'] = 'HIT'
+            return response
+        
         try:
-            if list_type == "following":
-                # Get users that the current user follows
-                networks = Network.objects.filter(follower=request.user).select_related('following')
-                users = [network.following for network in networks]
-            else:
-                # Get users that follow the current user
-                networks = Network.objects.filter(following=request.user).select_related('follower')
-                users = [network.follower for network in networks]
-            
-            user_data = []
-            
-            for user in users:
-                try:
-                    # Get the latest checklist for this user (regardless of date)
-                    latest_checklist = user.user_checklists.order_by('-created_at').first()
-                    
-                    if latest_checklist:
-                        # Send actual score and UTC creation timestamp
-                        user_data.append({
-                            "id": user.id,
-                            "username": user.username,
-                            "regret_index": float(latest_checklist.score),
-                            "checklist_created_at": latest_checklist.created_at.astimezone(pytz.UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
-                            "allow_networking": user.allow_networking,
-                            "followers_count": max(0, user.followers_count),
-                            "following_count": max(0, user.following_count),
-                            "date_joined": user.date_joined
-                        })
-                    else:
-                        # User has no checklists at all - skip them
-                        continue
-                        
-                except Exception as e:
-                    logger.error(f"Error processing user {user.id} in network list: {e}")
-                    # Skip problematic users but continue with others
-                    continue
-            
-            return Response({
-                "list_type": list_type,
-                "count": len(user_data),
-                "users": user_data
-            }, status=200)
-            
+            payload = network_list_payload(request, request.user, list_type)
+        except NotFound:
+            # Invalid or stale cursor
+            raise
         except Exception as e:
             logger.error(f"Error getting {list_type} list: {e}")
             return Response({"error": "Network operation failed"}, status=500)
+        
+        set_network_list(cache_key, payload)
+        response = Response(payload, status=200)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class NetworkLeaderboardView(APIView):
+    """Users the current user follows, ranked by the regret index of their latest checklist"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Get one page of the leaderboard; ?order=desc puts the highest regret index first"""
+        order = request.query_params.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            raise ValidationError("order must be asc or desc")
+
+        # Scores are kept on the edges, so this is one range scan of the leaderboard index
+        edges = (
+            Network.objects.filter(follower=request.user, following_score__isnull=False)
+            .values('id', 'following', 'following_score', 'following_checklist_at', following_username=F('following__username'))
+        )
+        paginator = LeaderboardCursorPagination()
+        if order == 'desc':
+            paginator.ordering = ('-following_score', '-id')
+        page = paginator.paginate_queryset(edges, request, view=self)
+
+        return Response({
+            "order": order,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "users": [
+                {
+                    "id": edge['following'],
+                    "username": edge['following_username'],
+                    "regret_index": float(edge['following_score']),
+                    "checklist_created_at": utc_timestamp(edge['following_checklist_at']),
+                }
+                for edge in page
+            ],
+        })
+
+
+class NetworkSuggestionsView(APIView):
+    """Suggest users to follow: those followed by the people the current user follows"""
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        """Get up to ?limit= suggestions, most mutual follows first"""
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError("limit must be an integer")
+        if not 1 <= limit <= self.max_limit:
+            raise ValidationError(f"limit must be between 1 and {self.max_limit}")
+
+        # Candidates come from the in-memory graph; over-fetch so users who
+        # cannot be followed can be dropped without a second round
+        candidates = follow_graph.suggestions(request.user.id, limit * 2)
+        users = User.objects.filter(
+            id__in=[user_id for user_id, _ in candidates], is_active=True, allow_networking=True,
+        ).only('id', 'username', 'followers_count').in_bulk()
+
+        suggestions = [
+            {
+                "id": user_id,
+                "username": users[user_id].username,
+                "followers_count": max(0, users[user_id].followers_count),
+                "followed_by_your_follows": followed_by,
+            }
+            for user_id, followed_by in candidates
+            if user_id in users
+        ][:limit]
+        return Response({"count": len(suggestions), "users": suggestions})
 
 
 class NetworkSettingsView(APIView):
@@ -415,3 +708,11 @@ class NetworkSettingsView(APIView):
         except Exception as e:
             logger.error(f"Error updating networking settings: {e}")
             return Response({"error": "Failed to update networking settings"}, status=500)
+
+
+class RuntimeMetricsView(APIView):
+    """Connection pool and cache metrics of the worker serving the request (staff only)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(runtime_metrics(), status=200)